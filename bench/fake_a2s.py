@@ -0,0 +1,94 @@
+import asyncio
+import random
+import struct
+
+HEADER = b"\xFF\xFF\xFF\xFF"
+MULTI_HEADER = b"\xFF\xFF\xFF\xFE"
+CHALLENGE = b"\x12\x34\x56\x78"
+
+
+def info_packet(name, players, max_players):
+    return (
+        HEADER + b"I\x11"
+        + name.encode() + b"\x00"
+        + b"TheIsland\x00ark\x00ARK: Survival Ascended\x00"
+        + struct.pack("<H", 0)
+        + bytes([players, max_players, 0])
+        + b"dw\x00\x01"
+        + b"1.0\x00"
+    )
+
+
+def players_packet(names):
+    body = b"".join(
+        bytes([i]) + name.encode() + b"\x00" + struct.pack("<lf", 0, 60.0 * i)
+        for i, name in enumerate(names)
+    )
+    return HEADER + b"D" + bytes([len(names)]) + body
+
+
+def split_packets(reply, split_id, size=1248):
+    # Source engine splits replies that don't fit in one datagram
+    if len(reply) <= 1400:
+        return [reply]
+    parts = [reply[i:i + size] for i in range(0, len(reply), size)]
+    return [
+        MULTI_HEADER + struct.pack("<LBBH", split_id, len(parts), n, size) + part
+        for n, part in enumerate(parts)
+    ]
+
+
+class _Responder(asyncio.DatagramProtocol):
+    def __init__(self, owner, port_index):
+        self.owner = owner
+        self.port_index = port_index
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.owner.received += 1
+        if self.owner.drop_rate and random.random() < self.owner.drop_rate:
+            self.owner.dropped += 1
+            return
+        if data[:4] != HEADER or len(data) < 5:
+            return
+        if not data.endswith(CHALLENGE):
+            reply = HEADER + b"A" + CHALLENGE
+        elif data[4] == 0x55:
+            # Players drift in and out of a fixed pool between queries; a full
+            # server's roster needs a split reply
+            reply = players_packet([f"SurvivorOfTheIsland{i}" for i in range(70) if random.random() < 0.5])
+        else:
+            reply = info_packet(f"Bench {self.port_index}", random.randint(0, 70), 70)
+        delay = max(0.0, random.gauss(self.owner.latency, self.owner.latency / 4))
+        for packet in split_packets(reply, random.getrandbits(31)):
+            asyncio.get_running_loop().call_later(delay, self.transport.sendto, packet, addr)
+
+
+class FakeA2S:
+    # A pool of UDP ports on 127.0.0.1 answering A2S_INFO/A2S_PLAYER with a challenge
+    # round trip. Each port stands in for one game server.
+    def __init__(self, ports, latency=0.02, drop_rate=0.0):
+        self.count = ports
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.received = 0
+        self.dropped = 0
+        self.ports = []
+        self._transports = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for i in range(self.count):
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda i=i: _Responder(self, i), local_addr=("127.0.0.1", 0)
+            )
+            self._transports.append(transport)
+            self.ports.append(transport.get_extra_info("sockname")[1])
+        return self.ports
+
+    def stop(self):
+        for transport in self._transports:
+            transport.close()
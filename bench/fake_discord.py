@@ -0,0 +1,74 @@
+import asyncio
+import itertools
+from collections import Counter
+
+_ids = itertools.count(10_000)
+
+
+class FakeDiscord:
+    # Shared counters and latency for every fake channel
+    def __init__(self, latency=0.03):
+        self.latency = latency
+        self.calls = Counter()
+
+    async def call(self, name):
+        self.calls[name] += 1
+        await asyncio.sleep(self.latency)
+
+
+class FakeMessage:
+    def __init__(self, api, channel, message_id):
+        self.api = api
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        await self.api.call("edit")
+
+    async def delete(self):
+        await self.api.call("delete")
+
+    async def pin(self):
+        await self.api.call("pin")
+
+
+class FakeChannel:
+    def __init__(self, api, channel_id):
+        self.api = api
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, *args, **kwargs):
+        await self.api.call("send")
+        return FakeMessage(self.api, self, next(_ids))
+
+    def get_partial_message(self, message_id):
+        return FakeMessage(self.api, self, message_id)
+
+
+class FakeGuild:
+    def __init__(self, api, guild_id, name=None):
+        self.id = guild_id
+        self.name = name or f"Bench guild {guild_id}"
+        self.channels = [FakeChannel(api, next(_ids))]
+
+    def get_channel(self, channel_id):
+        return next((c for c in self.channels if c.id == channel_id), None)
+
+
+class FakeBot:
+    def __init__(self, guilds):
+        self.guilds = guilds
+        self.dispatched = Counter()
+
+    def get_guild(self, guild_id):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    async def wait_until_ready(self):
+        return
+
+    def is_ready(self):
+        return True
+
+    def dispatch(self, event, *args):
+        self.dispatched[event] += 1
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+
+from aiohttp import web
+
+STATUSES = ["started"] * 8 + ["restarting", "suspended"]
+
+
+class FakeNitrado:
+    # Local stand-in for api.nitrado.net serving /services, /gameservers and
+    # /players for a generated fleet. Note the A2S endpoint is reported under
+    # data.query, which is where the status cog looks for it.
+    def __init__(self, fleet, latency=0.05, jitter=0.02, error_rate=0.0, a2s_ports=None):
+        self.fleet = fleet              # {token: [sid, ...]}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.a2s_ports = a2s_ports or {}  # {sid: udp port}
+        self.requests = Counter()
+        self.not_modified = 0
+        self.errors = 0
+        self._runner = None
+        self.url = None
+
+    async def _delay(self):
+        delay = max(0.0, random.gauss(self.latency, self.jitter))
+        await asyncio.sleep(delay)
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"status": "error", "message": "simulated"}, status=503)
+        return None
+
+    def _conditional(self, request, payload):
+        # ETag revalidation like the real API: 304 with no body when unchanged
+        etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.json_response(payload, headers={"ETag": etag})
+
+    def _token(self, request):
+        return request.headers.get("Authorization", "").removeprefix("Bearer ")
+
+    async def services(self, request):
+        self.requests["services"] += 1
+        await self._delay()
+        token = self._token(request)
+        if token not in self.fleet:
+            return web.json_response({"status": "error", "message": "Access token not valid"}, status=401)
+        services = [
+            {"id": int(sid), "type": "gameserver",
+             "details": {"name": f"Bench ARK {sid}", "game": "ARK: Survival Ascended"}}
+            for sid in self.fleet[token]
+        ]
+        return self._conditional(request, {"status": "success", "data": {"services": services}})
+
+    async def gameservers(self, request):
+        self.requests["gameservers"] += 1
+        await self._delay()
+        if self._token(request) not in self.fleet:
+            return web.json_response({"status": "error", "message": "Access token not valid"}, status=401)
+        failure = self._maybe_fail()
+        if failure is not None:
+            return failure
+        sid = request.match_info["sid"]
+        rng = random.Random(int(sid))
+        query = {}
+        if sid in self.a2s_ports:
+            query = {"address": "127.0.0.1", "port": self.a2s_ports[sid]}
+        return self._conditional(request, {"status": "success", "data": {
+            "gameserver": {
+                "status": rng.choice(STATUSES),
+                "slots": 70,
+                "label": f"Bench ARK {sid}",
+                "settings": {"config": {"map": rng.choice(["TheIsland", "ScorchedEarth", "Aberration"])}},
+            },
+            "query": query,
+        }})
+
+    async def players(self, request):
+        self.requests["players"] += 1
+        await self._delay()
+        failure = self._maybe_fail()
+        if failure is not None:
+            return failure
+        count = random.randint(0, 70)
+        players = [{"name": f"Survivor{i}", "online": True} for i in range(count)]
+        return web.json_response({"status": "success", "data": {"players": players}})
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_get("/services", self.services)
+        app.router.add_get("/services/{sid}/gameservers", self.gameservers)
+        app.router.add_get("/services/{sid}/players", self.players)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,249 @@
+# Offline load test for the status poller.
+#
+#   python -m bench.run_bench --guilds 300 --servers 7 --cycles 3
+#
+# Spins up a fake Nitrado API, fake A2S responders and a fake Discord layer,
+# then drives SetStatusUpdateCog.update_status_loop with every server due on
+# each cycle. Nothing leaves 127.0.0.1 and guild configs go to a temp dir.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Keep the bench away from the real config store, any SQLite database and
+# the warm start file
+os.environ["CONFIG_BACKEND"] = "json"
+os.environ["WARM_START_PATH"] = os.path.join(tempfile.mkdtemp(prefix="ark-bench-warm-"), "warm_start.json.gz")
+
+import utils.config as config_module
+from utils.config import save_config, flush_configs
+from utils.nitrado import NitradoClient
+from utils.poll_scheduler import PollScheduler
+from utils.scheduler import GuildScheduler
+from utils.timeseries import TimeSeriesStore
+from bench.fake_nitrado import FakeNitrado
+from bench.fake_a2s import FakeA2S
+from bench.fake_discord import FakeDiscord, FakeGuild, FakeBot
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * (len(values) - 1)))))
+    return values[index]
+
+
+class LagMonitor:
+    # Sleeps in short steps and records how late each wake-up is
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def reset(self):
+        self.samples = []
+
+
+def build_fleet(guild_count, servers_per_guild, shared_fraction, seed):
+    # Each guild gets its own token; a share of its servers come from a common
+    # pool so several guilds track the same service ids
+    rng = random.Random(seed)
+    shared_pool = [str(20_000_000 + i) for i in range(max(1, servers_per_guild * 4))]
+    next_sid = 30_000_000
+    fleet = {}
+    for g in range(guild_count):
+        sids = []
+        for _ in range(servers_per_guild):
+            if rng.random() < shared_fraction:
+                sid = rng.choice(shared_pool)
+                if sid in sids:
+                    continue
+            else:
+                sid = str(next_sid)
+                next_sid += 1
+            sids.append(sid)
+        fleet[f"bench-token-{g}"] = sids
+    return fleet
+
+
+async def run(args):
+    from cogs.slash.setstatusupdate import SetStatusUpdateCog
+
+    config_module.CONFIG_DIR = tempfile.mkdtemp(prefix="ark-bench-configs-")
+    fleet = build_fleet(args.guilds, args.servers, args.shared, args.seed)
+    all_sids = sorted({sid for sids in fleet.values() for sid in sids})
+
+    a2s = FakeA2S(min(len(all_sids), args.a2s_ports), latency=args.a2s_latency, drop_rate=args.a2s_drop)
+    ports = await a2s.start()
+    a2s_ports = {sid: ports[i % len(ports)] for i, sid in enumerate(all_sids)} if args.a2s_ports else {}
+    nitrado = FakeNitrado(fleet, latency=args.latency, jitter=args.latency / 4,
+                          error_rate=args.error_rate, a2s_ports=a2s_ports)
+    await nitrado.start()
+    discord_api = FakeDiscord(latency=args.discord_latency)
+
+    guilds = []
+    for g, (token, sids) in enumerate(fleet.items()):
+        guild = FakeGuild(discord_api, 1_000_000 + g)
+        guilds.append(guild)
+        save_config(guild.id, {
+            "nitrado_token": token,
+            "server_ids": sids,
+            "server_names": {sid: f"Bench ARK {sid}" for sid in sids},
+            "status_channel_id": guild.channels[0].id,
+            **({"player_log_channel_id": guild.channels[0].id} if args.player_log else {}),
+        }, guild_name=guild.name)
+
+    bot = FakeBot(guilds)
+    cog = SetStatusUpdateCog(bot)
+    cog.update_status_loop.cancel()
+    cog.nitrado = NitradoClient(base_url=nitrado.url, rate=args.rate)
+    cog.timeseries = TimeSeriesStore(tempfile.mkdtemp(prefix="ark-bench-ts-"))
+    cog.scheduler = GuildScheduler(args.concurrency, args.interval, timeout=args.guild_timeout)
+
+    server_latencies = []
+    fetch_status = cog.fetch_status
+
+    async def timed_fetch_status(*a, **kw):
+        start = time.perf_counter()
+        try:
+            return await fetch_status(*a, **kw)
+        finally:
+            server_latencies.append(time.perf_counter() - start)
+
+    cog.fetch_status = timed_fetch_status
+
+    lag = LagMonitor()
+    lag.start()
+    cycles = []
+    try:
+        for cycle in range(args.cycles):
+            # Fresh scheduler with no budgets: every server is due this cycle
+            cog.poll_scheduler = PollScheduler(global_per_minute=10**9, guild_per_tick=10**9)
+            server_latencies.clear()
+            lag.reset()
+            before_http = sum(nitrado.requests.values())
+            before_udp = a2s.received
+            before_discord = sum(discord_api.calls.values())
+            start = time.perf_counter()
+            await cog.update_status_loop()
+            # The tick only starts the refreshes; wait for them to finish
+            await asyncio.gather(*cog._refresh_cycles)
+            wall = time.perf_counter() - start
+            # Discord writes are queued; let them finish before counting
+            await cog.writes.drain()
+            drain = time.perf_counter() - start - wall
+            cycles.append({
+                "cycle": cycle + 1,
+                "wall_s": round(wall, 3),
+                "write_drain_s": round(drain, 3),
+                "servers_polled": len(server_latencies),
+                "server_p50_ms": round(percentile(server_latencies, 50) * 1000, 1),
+                "server_p99_ms": round(percentile(server_latencies, 99) * 1000, 1),
+                "nitrado_requests": sum(nitrado.requests.values()) - before_http,
+                "a2s_datagrams": a2s.received - before_udp,
+                "discord_calls": sum(discord_api.calls.values()) - before_discord,
+                "loop_stall_max_ms": round(max(lag.samples, default=0) * 1000, 1),
+                "loop_stall_total_ms": round(sum(lag.samples) * 1000, 1),
+            })
+    finally:
+        lag.stop()
+        cog.cog_unload()
+        await cog.nitrado.close()
+        await nitrado.stop()
+        a2s.stop()
+        flush_configs()
+
+    return {
+        "fleet": {
+            "guilds": args.guilds,
+            "servers_per_guild": args.servers,
+            "unique_servers": len(all_sids),
+            "nitrado_latency_ms": args.latency * 1000,
+            "nitrado_error_rate": args.error_rate,
+            "a2s_drop_rate": args.a2s_drop,
+        },
+        "cycles": cycles,
+        "totals": {
+            "nitrado_requests": dict(nitrado.requests),
+            "nitrado_errors": nitrado.errors,
+            "nitrado_not_modified": nitrado.not_modified,
+            "a2s_datagrams": a2s.received,
+            "a2s_dropped": a2s.dropped,
+            "discord_calls": dict(discord_api.calls),
+        },
+    }
+
+
+def print_report(result):
+    fleet = result["fleet"]
+    print(f"Fleet: {fleet['guilds']} guild(s) x {fleet['servers_per_guild']} server(s), "
+          f"{fleet['unique_servers']} unique")
+    header = ("cycle", "wall_s", "write_drain_s", "servers_polled", "server_p50_ms", "server_p99_ms",
+              "nitrado_requests", "a2s_datagrams", "discord_calls",
+              "loop_stall_max_ms", "loop_stall_total_ms")
+    print("  ".join(header))
+    for row in result["cycles"]:
+        print("  ".join(str(row[h]).rjust(len(h)) for h in header))
+    totals = result["totals"]
+    print(f"Nitrado requests: {totals['nitrado_requests']} ({totals['nitrado_errors']} simulated errors, "
+          f"{totals['nitrado_not_modified']} not modified)")
+    print(f"A2S datagrams: {totals['a2s_datagrams']} ({totals['a2s_dropped']} dropped)")
+    print(f"Discord calls: {totals['discord_calls']}")
+    walls = [row["wall_s"] for row in result["cycles"]]
+    if walls:
+        print(f"Cycle wall time: mean {statistics.mean(walls):.2f}s, max {max(walls):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the status poller")
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--servers", type=int, default=7, help="servers per guild")
+    parser.add_argument("--shared", type=float, default=0.2, help="fraction of servers drawn from a shared pool")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.08, help="Nitrado response latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Nitrado calls answering 503")
+    parser.add_argument("--a2s-latency", type=float, default=0.03)
+    parser.add_argument("--a2s-drop", type=float, default=0.0, help="fraction of A2S datagrams dropped")
+    parser.add_argument("--a2s-ports", type=int, default=512, help="UDP responders (0 disables A2S)")
+    parser.add_argument("--discord-latency", type=float, default=0.05)
+    parser.add_argument("--player-log", action="store_true", help="enable join/leave logging (adds A2S_PLAYER queries)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.0,
+                        help="cycle budget (s); guild starts are staggered over half of it")
+    parser.add_argument("--guild-timeout", type=float, default=120)
+    parser.add_argument("--rate", type=float, default=50, help="Nitrado requests/s per token")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
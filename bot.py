@@ -1,20 +1,41 @@
+from utils.startup import startup, sync_tree_if_changed
 import discord
 from discord.ext import commands
 import asyncio
 import os
-from settings import BOT_TOKEN
+import signal
+from settings import BOT_TOKEN, SHARD_IDS, SHARD_COUNT, WORKER_ID
+from utils.nitrado import close_client
+from utils.metrics import start_metrics_server, stop_metrics_server, summary as perf_summary
 import logging
 
 logging.basicConfig(level=logging.INFO)
+startup.mark("imports")
 
 intents = discord.Intents(guilds=True, messages=True, message_content=True)
-bot = commands.Bot(command_prefix="!", intents=intents)
+if SHARD_IDS is not None:
+    # Launched by launcher.py: this process runs a slice of the shards
+    bot = commands.AutoShardedBot(
+        command_prefix="!", intents=intents, shard_ids=SHARD_IDS, shard_count=SHARD_COUNT
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
 
 @bot.event
 async def on_ready():
+    # on_ready fires again after every full gateway reconnect
+    if "first ready" in startup.phases:
+        logging.info(f"🔁 Reconnected: {bot.user}")
+        return
+    startup.mark("first ready")
     logging.info(f"✅ Bot is ready: {bot.user}")
+    if WORKER_ID != 0:
+        # The command tree is global; one worker syncing it is enough
+        return
     try:
-        synced = await bot.tree.sync()  # Global sync
+        synced = await sync_tree_if_changed(bot)
+        if synced is None:
+            return
         logging.info("🔧 Slash commands synchronized:")
         for cmd in synced:
             logging.info(f"   • /{cmd.name} - {cmd.description}")
@@ -27,6 +48,11 @@ async def listslash(ctx):
     commands_list = [cmd.name for cmd in bot.tree.get_commands()]
     await ctx.send(f"🔍 Slash commands loaded: {', '.join(commands_list)}")
 
+@bot.command()
+@commands.is_owner()
+async def perf(ctx):
+    await ctx.send(f"```\n{perf_summary()[:1900]}\n```")
+
 @bot.command()
 @commands.is_owner()
 async def load(ctx, extension):
@@ -53,16 +79,38 @@ async def on_command_error(ctx, error):
 async def on_application_command(ctx):
     logging.info(f"[SLASH] /{ctx.command.name} used by {ctx.user} in {ctx.guild.name}")
 
+async def load_cog(extension):
+    try:
+        await bot.load_extension(extension)
+        logging.info(f"🔌 Loaded: {extension}")
+    except Exception as e:
+        logging.error(f"⚠️ Failed to load {extension}: {e}")
+
 async def main():
-    for filename in os.listdir("./cogs/slash"):
-        if filename.endswith(".py") and filename != "__init__.py":
-            extension = f"cogs.slash.{filename[:-3]}"
-            try:
-                await bot.load_extension(extension)
-                logging.info(f"🔌 Loaded: {extension}")
-            except Exception as e:
-                logging.error(f"⚠️ Failed to load {extension}: {e}")
+    extensions = [
+        f"cogs.slash.{filename[:-3]}"
+        for filename in sorted(os.listdir("./cogs/slash"))
+        if filename.endswith(".py") and filename != "__init__.py"
+    ]
+    await asyncio.gather(*(load_cog(extension) for extension in extensions))
+    startup.mark("cog load")
 
-    await bot.start(BOT_TOKEN)
+    await start_metrics_server()
+    try:
+        # Heroku and launcher.py stop the bot with SIGTERM; close it cleanly so
+        # the cogs unload and pending config saves are flushed on exit
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(bot.close()))
+    except NotImplementedError:
+        pass
+    try:
+        await bot.login(BOT_TOKEN)
+        startup.mark("login")
+        await bot.connect()
+    finally:
+        if not bot.is_closed():
+            # Unloads the cogs, which saves the warm start file
+            await bot.close()
+        await stop_metrics_server()
+        await close_client()
 
 asyncio.run(main())
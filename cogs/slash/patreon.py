@@ -0,0 +1,152 @@
+# patreon.py
+
+import discord
+from discord import app_commands
+from discord.ext.commands import GroupCog
+from discord.ext import tasks
+import aiohttp
+from aiohttp import web
+from utils.patreon import (
+    PatreonClient, PatreonError, get_entitlements, sign_state, verify_state,
+    authorize_url, token_fields, REFRESH_MARGIN,
+)
+from settings import PATREON_CLIENT_ID, PATREON_CAMPAIGN_ID, OAUTH_HOST, OAUTH_PORT, WORKER_ID
+import logging
+import asyncio
+import time
+
+class PatreonCog(GroupCog, name="patreon"):
+    def __init__(self, bot):
+        self.bot = bot
+        self.client = PatreonClient()
+        self.entitlements = get_entitlements()
+        self._runner = None
+        # Without a campaign id any pledge to any creator would count, so
+        # linking stays off until both are set
+        self.configured = bool(PATREON_CLIENT_ID) and bool(PATREON_CAMPAIGN_ID)
+        if PATREON_CLIENT_ID and not PATREON_CAMPAIGN_ID:
+            logging.error("[ERROR] PATREON_CAMPAIGN_ID is not set; Patreon linking is disabled")
+        # Sharded deployments serve the callback and refresh pledges on worker 0 only
+        self.enabled = self.configured and WORKER_ID == 0
+
+    async def cog_load(self):
+        if not self.enabled:
+            return
+        app = web.Application()
+        app.router.add_get("/patreon/callback", self.oauth_callback)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, OAUTH_HOST, OAUTH_PORT).start()
+        logging.info(f"🔗 Patreon callback on http://{OAUTH_HOST}:{OAUTH_PORT}/patreon/callback")
+        self.refresh_loop.start()
+
+    async def cog_unload(self):
+        self.refresh_loop.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await self.client.close()
+
+    async def oauth_callback(self, request):
+        if request.query.get("error"):
+            return web.Response(text="Patreon linking was cancelled.", status=400)
+        linked = verify_state(request.query.get("state", ""))
+        code = request.query.get("code")
+        if not linked or not code:
+            return web.Response(text="This link is invalid or has expired. Run /patreon link again.", status=400)
+        guild_id, user_id = linked
+        try:
+            token = await self.client.exchange_code(code)
+            patron_id, patron_status, cents = await self.client.membership(token["access_token"])
+        except (PatreonError, KeyError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"[ERROR] Patreon linking failed for guild {guild_id}: {e}")
+            return web.Response(text="Patreon didn't accept the login. Please try again.", status=502)
+
+        await asyncio.to_thread(self.entitlements.put, guild_id, {
+            **token_fields(token),
+            "patron_id": patron_id,
+            "patron_status": patron_status,
+            "cents": cents,
+            "linked_by": user_id,
+            "checked_at": time.time(),
+        })
+        premium = self.entitlements.is_premium(guild_id)
+        logging.info(f"🔗 Patreon linked for guild {guild_id} ({patron_status}, {cents}c)")
+        return web.Response(text=(
+            "✅ Patreon linked. Premium polling is now active for your Discord server. You can close this tab."
+            if premium else
+            "✅ Patreon linked, but no active pledge at the premium tier was found. You can close this tab."
+        ))
+
+    @tasks.loop(hours=1)
+    async def refresh_loop(self):
+        # Refresh tokens before they expire and re-read each pledge now and
+        # then, so tier lookups on the poll path stay current without I/O
+        changed = {}
+        for guild_id, record in self.entitlements.items():
+            if not self.entitlements.due(record):
+                continue
+            record = dict(record)
+            try:
+                if record.get("expires_at", 0) - time.time() < REFRESH_MARGIN and record.get("refresh_token"):
+                    record.update(token_fields(await self.client.refresh(record["refresh_token"])))
+                _, record["patron_status"], record["cents"] = await self.client.membership(record["access_token"])
+            except PatreonError as e:
+                if e.status in (400, 401, 403):
+                    # The patron revoked access; premium lapses until they relink
+                    record["patron_status"] = "revoked"
+                    record["cents"] = 0
+                logging.warning(f"[WARN] Patreon refresh failed for guild {guild_id}: {e}")
+            except Exception as e:
+                logging.warning(f"[WARN] Patreon refresh failed for guild {guild_id}: {e}")
+                continue
+            record["checked_at"] = time.time()
+            changed[guild_id] = record
+        if changed:
+            await asyncio.to_thread(self.entitlements.merge, changed)
+
+    @refresh_loop.before_loop
+    async def before_refresh(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="link", description="Link a Patreon pledge to this server for faster updates.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def link(self, interaction: discord.Interaction):
+        if not self.configured:
+            await interaction.response.send_message("⚠️ Patreon linking is not configured on this bot.", ephemeral=True)
+            return
+        url = authorize_url(sign_state(interaction.guild.id, interaction.user.id))
+        await interaction.response.send_message(
+            f"🔗 [Log in with Patreon]({url}) to link your pledge to **{interaction.guild.name}**. "
+            f"The link expires in 15 minutes.",
+            ephemeral=True,
+        )
+
+    @app_commands.command(name="status", description="Show this server's Patreon tier.")
+    async def status(self, interaction: discord.Interaction):
+        self.entitlements.reload_if_changed()
+        record = self.entitlements.get(interaction.guild.id)
+        if not record:
+            await interaction.response.send_message("ℹ️ No Patreon pledge linked. Use `/patreon link`.", ephemeral=True)
+            return
+        tier = "⭐ Premium" if self.entitlements.is_premium(interaction.guild.id) else "Standard"
+        await interaction.response.send_message(
+            f"{tier} · pledge `{record.get('cents', 0) / 100:.2f}` · status `{record.get('patron_status')}` · "
+            f"checked <t:{int(record.get('checked_at', 0))}:R>",
+            ephemeral=True,
+        )
+
+    @app_commands.command(name="unlink", description="Remove the Patreon link from this server.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def unlink(self, interaction: discord.Interaction):
+        if not self.configured:
+            await interaction.response.send_message("⚠️ Patreon linking is not configured on this bot.", ephemeral=True)
+            return
+        # Any worker can remove the link; the file is updated under a lock
+        if not await asyncio.to_thread(self.entitlements.remove, interaction.guild.id):
+            await interaction.response.send_message("⚠️ No Patreon pledge linked here.", ephemeral=True)
+            return
+        await interaction.response.send_message("🛑 Patreon link removed.", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(PatreonCog(bot))
@@ -5,178 +5,682 @@ from discord import app_commands
 from discord.ext.commands import GroupCog
 from discord.ext import tasks
 from utils.config import load_config, save_config
+from utils.scheduler import GuildScheduler
+from utils.a2s_async import get_engine, close_engine  # Use A2S protocol for reliable player counts
+from utils.nitrado import get_client, NitradoError
+from utils.cache import TTLCache
+from utils.poll_scheduler import PollScheduler
+from utils.timeseries import TimeSeriesStore
+from utils.metrics import REGISTRY, timer, count_request
+from utils.coordinator import get_coordinator
+from utils.players import PlayerTracker, online_players
+from utils.startup import startup
+from utils.breaker import CircuitBreakers, BreakerOpen, OPEN, CLOSED
+from utils.patreon import get_entitlements
+from utils.write_queue import WriteQueue
+from utils import warm_start
+from settings import (
+    STATUS_INTERVAL_MINUTES, STATUS_CONCURRENCY, STATUS_GUILD_TIMEOUT,
+    STATUS_CACHE_TTL, STATUS_CACHE_STALE_TTL, STATUS_CACHE_MAX_ENTRIES,
+    STATUS_TICK_SECONDS, STATUS_POLL_TRANSITIONAL_SECONDS, WARM_START_SAVE_SECONDS,
+)
 from datetime import datetime, timezone
-import aiohttp
-import a2s  # Use A2S protocol for reliable player counts
 import logging
 import asyncio
+import hashlib
+import time
+import json
+
+# Discord's limit on the total text in one message's embeds
+EMBED_MAX_CHARS = 6000
+
+def embed_fingerprint(embed):
+    # Everything except the "last changed" timestamp in the description
+    data = embed.to_dict()
+    data.pop("description", None)
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
 
 class SetStatusUpdateCog(GroupCog, name="status"):
     def __init__(self, bot):
         self.bot = bot
-        self.status_message = None
+        # Fingerprint of the last embed queued per guild, to skip no-op edits,
+        # and of the last one actually posted, which is what a restart keeps
+        self.status_fingerprints = {}
+        self.posted_fingerprints = {}
+        self.scheduler = GuildScheduler(
+            concurrency=STATUS_CONCURRENCY,
+            interval=STATUS_TICK_SECONDS,
+            timeout=STATUS_GUILD_TIMEOUT,
+            report_every=STATUS_INTERVAL_MINUTES * 60,
+        )
+        # Decides when each service id is next fetched, from its last status
+        self.poll_scheduler = PollScheduler()
+        # Patreon tiers, cached in memory; premium guilds get shorter intervals
+        self.entitlements = get_entitlements()
+        self.timeseries = TimeSeriesStore()
+        self.a2s = get_engine()
+        self.nitrado = get_client()
+        # Shared by every guild: keyed by (service id, token) so guilds that
+        # track the same server reuse one poll (Nitrado metadata, A2S and the
+        # /players fallback) per TTL
+        self.server_cache = TTLCache(
+            "servers", STATUS_CACHE_TTL, STATUS_CACHE_STALE_TTL, STATUS_CACHE_MAX_ENTRIES
+        )
+        REGISTRY.gauge("ark_cache_hits_total", lambda: self.server_cache.hits, cache="servers")
+        REGISTRY.gauge("ark_cache_stale_hits_total", lambda: self.server_cache.stale_hits, cache="servers")
+        REGISTRY.gauge("ark_cache_misses_total", lambda: self.server_cache.misses, cache="servers")
+        # Service ids leased to another worker are never polled here; we render
+        # the latest snapshot that worker published instead
+        self.coordinator = get_coordinator()
+        self.foreign_sids = set()
+        self.remote_snapshots = {}
+        # Dead service ids and rejected tokens are not polled while their
+        # breaker is open; guilds see the last good snapshot, marked stale
+        self.server_breaker = CircuitBreakers("server")
+        self.token_breaker = CircuitBreakers("token")
+        self.last_good = {}
+        # Tokens already counted as rejected this tick: a guild's servers are
+        # polled together, so one refresh must not trip the breaker on its own
+        self._rejected_tokens = set()
+        REGISTRY.gauge("ark_breakers_open", self.server_breaker.open_count, breaker="server")
+        REGISTRY.gauge("ark_breakers_open", self.token_breaker.open_count, breaker="token")
+        # Join/leave tracking for guilds with a player log channel
+        self.players = PlayerTracker()
+        self.player_log_channels = {}
+        self.roster_sids = set()
+        REGISTRY.gauge("ark_tracked_rosters", lambda: len(self.players))
+        REGISTRY.gauge("ark_tracked_servers", lambda: len(self.poll_scheduler))
+        REGISTRY.gauge("ark_poll_deferred_total", lambda: self.poll_scheduler.deferred)
+        # Every Discord write goes through here, off the polling path
+        self.writes = WriteQueue()
+        REGISTRY.gauge("ark_discord_queue_depth", lambda: len(self.writes))
+        REGISTRY.gauge("ark_discord_writes_dropped_total", lambda: self.writes.dropped)
+        REGISTRY.gauge("ark_discord_writes_failed_total", lambda: self.writes.failed)
+        REGISTRY.gauge("ark_discord_writes_rate_limited_total", lambda: self.writes.rate_limited)
+        # Snapshots and posted embeds from before the last restart. Servers
+        # are served from them straight away and re-polled as they come due.
+        self.warm_start_path = warm_start.default_path()
+        self.warm_servers, warm_guilds, self.warm_schedule = warm_start.load(self.warm_start_path)
+        self.last_good.update(self.warm_servers)
+        self.status_fingerprints.update(warm_guilds)
+        self.posted_fingerprints.update(warm_guilds)
+        self._warm_saved_at = time.monotonic()
+        if self.warm_servers:
+            logging.info(f"♨️ Warm start: {len(self.warm_servers)} server snapshot(s), {len(warm_guilds)} guild(s)")
+        # In-progress refresh per guild, and guilds whose config changed mid-refresh
+        self._refresh_tasks = {}
+        self._refresh_again = set()
+        # Background refresh cycles started by update_status_loop
+        self._refresh_cycles = set()
         self.update_status_loop.start()
 
-    @tasks.loop(minutes=10)
+    def cog_unload(self):
+        self.update_status_loop.cancel()
+        for cycle in self._refresh_cycles:
+            cycle.cancel()
+        self.writes.close()
+        close_engine()
+        self.timeseries.flush()
+        try:
+            warm_start.save(self.warm_start_path, *self.warm_start_state())
+        except OSError as e:
+            logging.error(f"[ERROR] could not save warm start file: {e}")
+
+    @tasks.loop(seconds=STATUS_TICK_SECONDS)
     async def update_status_loop(self):
         await self.bot.wait_until_ready()
+        self._rejected_tokens.clear()
 
+        guilds = {}
+        guild_servers = {}
+        guild_tokens = {}
+        player_log_channels = {}
         for guild in self.bot.guilds:
-            config     = load_config(guild.id)
-            channel_id = config.get("status_channel_id")
-            server_ids = config.get("server_ids", [])
-            name_map   = config.get("server_names", {})
+            config = load_config(guild.id)
+            # A guild whose status channel was deleted can't be refreshed, so
+            # its servers aren't scheduled at all
+            if (config.get("status_channel_id") and config.get("server_ids") and config.get("nitrado_token")
+                    and guild.get_channel(config["status_channel_id"])):
+                guilds[guild.id] = guild
+                guild_servers[guild.id] = config["server_ids"]
+                guild_tokens[guild.id] = config["nitrado_token"]
+                if config.get("player_log_channel_id"):
+                    player_log_channels[guild.id] = config["player_log_channel_id"]
+        seeds = None
+        if self.warm_servers is not None:
+            seeds = self.apply_warm_start(guild_servers, guild_tokens)
+            self.warm_servers = self.warm_schedule = None
+        dropped = self.poll_scheduler.sync(guild_servers, seeds)
+        if dropped:
+            # Let another worker take over servers we no longer show
+            self.foreign_sids.difference_update(dropped)
+            for sid in dropped:
+                self.remote_snapshots.pop(sid, None)
+            await self.coordinator.release(dropped)
+        self.entitlements.reload_if_changed()
+        self.poll_scheduler.premium_guilds = self.entitlements.premium_guilds(guild_servers)
+        self.player_log_channels = player_log_channels
+        self.roster_sids = {str(sid) for guild_id in player_log_channels for sid in guild_servers[guild_id]}
+        self.players.retain(self.roster_sids)
+        tracked = {str(sid) for sids in guild_servers.values() for sid in sids}
+        self.server_breaker.retain(tracked)
+        self.token_breaker.retain(set(guild_tokens.values()))
+        for sid in [sid for sid in self.last_good if sid not in tracked]:
+            del self.last_good[sid]
+
+        if time.monotonic() - self._warm_saved_at >= WARM_START_SAVE_SECONDS:
+            self._warm_saved_at = time.monotonic()
+            try:
+                await asyncio.to_thread(warm_start.save, self.warm_start_path, *self.warm_start_state())
+            except OSError as e:
+                logging.error(f"[ERROR] could not save warm start file: {e}")
 
-            if not channel_id or not server_ids:
-                continue
+        due = self.poll_scheduler.pop_due()
+        if not due:
+            return
+        owned, foreign = await self.coordinator.partition(due)
+        self.foreign_sids.difference_update(owned)
+        self.foreign_sids.update(foreign)
+        for sid in owned:
+            self.remote_snapshots.pop(sid, None)
+        if foreign:
+            snapshots = await self.coordinator.snapshots(foreign)
+            for sid in foreign:
+                snapshot = snapshots.get(sid)
+                if snapshot is None:
+                    # The owner hasn't published yet (both workers tick together
+                    # at startup); look again shortly rather than guessing
+                    self.poll_scheduler.release(sid)
+                    continue
+                self.remote_snapshots[sid] = snapshot
+                if self.poll_scheduler.observe(sid, snapshot["status"].lower()):
+                    self.track_players(sid, snapshot)
+        affected = set()
+        for sid in due:
+            for guild_id in self.poll_scheduler.guilds_for(sid):
+                affected.add(guild_id)
+                # Due servers are refetched; everything else comes from cache
+                self.server_cache.invalidate((sid, guild_tokens[guild_id]))
+        # Refreshes run in the background so one slow guild never holds up
+        # the next tick; servers in flight aren't handed out again meanwhile
+        cycle = asyncio.ensure_future(self.refresh_due(due, [guilds[guild_id] for guild_id in affected]))
+        self._refresh_cycles.add(cycle)
+        cycle.add_done_callback(self._refresh_cycles.discard)
 
-            channel = guild.get_channel(channel_id)
-            if not channel:
-                continue
+    async def refresh_due(self, due, guilds):
+        # Each due server is released (retried shortly) as soon as every guild
+        # showing it has refreshed, if none of them observed it
+        waiting = {sid: set(self.poll_scheduler.guilds_for(sid)) for sid in due}
+        for sid in [sid for sid, pending in waiting.items() if not pending]:
+            self.poll_scheduler.release(sid)
+            del waiting[sid]
 
-            token = config.get("nitrado_token")
-            # We'll determine embed color dynamically
-            embed_color = discord.Color.green()
-            status_list = []
-            suspended_list = []
-            has_yellow = False
-            has_red = False
-
-            if not token:
-                embed = discord.Embed(
-                    title="📡 Ark Server Status",
-                    color=discord.Color.red()
-                )
-                embed.description = "❌ No Nitrado token configured."
-            else:
-                async with aiohttp.ClientSession(
-                    headers={"Authorization": f"Bearer {token}"}
-                ) as session:
-                    async def fetch_status(sid):
-                        custom_name  = name_map.get(str(sid))
-                        display_name = custom_name or f"Server {sid}"
-                        try:
-                            main_url = f"https://api.nitrado.net/services/{sid}/gameservers"
-                            async with session.get(main_url) as resp:
-                                if resp.status != 200:
-                                    raise ValueError(f"Metadata fetch failed: {resp.status}")
-                                mdata = await resp.json()
-                            gs = mdata.get("data", {}).get("gameserver", {}) or {}
-                            q  = mdata.get("data", {}).get("query", {})      or {}
-                            logging.debug(f"[DEBUG] query info for {sid}: {q}")
-                            slots = gs.get("slots", "?")
-                            status = gs.get("status", "unknown")
-                            cfg = gs.get("settings", {}).get("config", {})
-                            map_name = cfg.get("map") or gs.get("label") or "Unknown"
-                            display_name = (
-                                custom_name or
-                                cfg.get("server-name") or
-                                gs.get("label") or
-                                display_name
-                            )
-                            players = None
-                            max_players = None
-                            host = q.get("address") or q.get("host")
-                            port = q.get("port") or q.get("query_port")
-                            if host and port:
-                                try:
-                                    info = a2s.info((host, int(port)))
-                                    players = info.player_count
-                                    max_players = info.max_players
-                                except Exception as a2s_err:
-                                    logging.warning(f"[WARN] A2S query failed for {sid}: {a2s_err}")
-                            if players is None:
-                                players_url = f"https://api.nitrado.net/services/{sid}/players"
-                                async with session.get(players_url) as presp:
-                                    if presp.status == 200:
-                                        pdata = await presp.json()
-                                        logging.debug(f"[DEBUG] /players response for {sid}: {pdata}")
-                                        plist = pdata.get("data", {}).get("data", []) or pdata.get("data", [])
-                                        players = len(plist)
-                            if players is None:
-                                players = 0
-                            if max_players is None:
-                                max_players = slots
-                        except Exception as e:
-                            logging.error(f"[ERROR] fetching data for {sid}: {e}")
-                            map_name     = "Unknown"
-                            display_name = custom_name or f"Server {sid}"
-                            players      = 0
-                            max_players  = "?"
-                            status       = "unknown"
-                        s = status.lower()
-                        if s in ("started", "online"):
-                            status_emoji = "🟢"
-                        elif s in ("restarting", "updating"):
-                            status_emoji = "🟡"
-                        else:
-                            status_emoji = "🔴"
-                        return {
-                            "name": display_name,
-                            "value": (
-                                f"🆔 ID: `{sid}`\n"
-                                f"🗺️ Map: `{map_name}`\n"
-                                f"🧍 Players: `{players}/{max_players}`\n"
-                                f"{status_emoji} Status: `{status}`"
-                            ),
-                            "status": s
-                        }
-                    results = await asyncio.gather(*(fetch_status(sid) for sid in server_ids))
-                    for result in results:
-                        if result["status"] in ("started", "online"):
-                            status_list.append(result)
-                        elif result["status"] in ("restarting", "updating"):
-                            status_list.append(result)
-                            has_yellow = True
-                        else:
-                            suspended_list.append(result)
-                            has_red = True
-                    # Set embed color
-                    if has_red:
-                        embed_color = discord.Color.red()
-                    elif has_yellow:
-                        embed_color = discord.Color.yellow()
-                    else:
-                        embed_color = discord.Color.green()
-                    embed = discord.Embed(
-                        title="📡 Ark Server Status",
-                        color=embed_color
-                    )
-                    # Add online/restarting servers first, then suspended/offline
-                    all_results = status_list + suspended_list
-                    for i, result in enumerate(all_results):
-                        embed.add_field(name=result["name"], value=result["value"], inline=False)
-                        # Only add blank field between servers, not after last
-                        if i < len(all_results) - 1:
-                            embed.add_field(name="\u200b", value="\u200b", inline=False)
-            embed.description = f"Last updated: <t:{int(datetime.now(timezone.utc).timestamp())}:R>"
-            embed.set_footer(text="Auto-updated every 10 minutes")
-            # Prune and send/edit message
+        async def refresh(guild):
+            try:
+                await asyncio.shield(self.request_refresh(guild))
+            finally:
+                for sid, pending in list(waiting.items()):
+                    pending.discard(guild.id)
+                    if not pending:
+                        self.poll_scheduler.release(sid)
+                        del waiting[sid]
+
+        try:
+            await self.scheduler.run_cycle(guilds, refresh)
+        finally:
+            for sid in waiting:
+                self.poll_scheduler.release(sid)
+            startup.mark("first status cycle")
+            await self.coordinator.flush()
+            await asyncio.to_thread(self.timeseries.flush)
+
+    def apply_warm_start(self, guild_servers, guild_tokens):
+        # Prime the server cache from the saved snapshots and return the
+        # scheduler seeds, so each server resumes the schedule it had
+        now = time.time()
+        seeds = {}
+        for guild_id, sids in guild_servers.items():
+            for sid in sids:
+                snapshot = self.warm_servers.get(str(sid))
+                if snapshot is None:
+                    continue
+                self.server_cache.set((str(sid), guild_tokens[guild_id]), snapshot)
+                schedule = self.warm_schedule.get(str(sid))
+                if schedule is not None:
+                    status, stable_polls, due_at = schedule
+                    seeds[str(sid)] = (status or snapshot["status"].lower(), stable_polls, due_at - now)
+                else:
+                    # Only seen through another worker's snapshot: due now, oldest first
+                    seeds[str(sid)] = (snapshot["status"].lower(), 0, snapshot["polled_at"] - now)
+        return seeds
+
+    def warm_start_state(self):
+        # Shallow copies taken on the loop; snapshots are never mutated
+        servers = {**self.remote_snapshots, **self.last_good}
+        return servers, dict(self.posted_fingerprints), self.poll_scheduler.export()
+
+    def request_refresh(self, guild, force=False):
+        # One refresh per guild at a time. A scheduled request joins the one
+        # already running; a forced one (config change) also queues a single
+        # re-run so the new config is picked up.
+        task = self._refresh_tasks.get(guild.id)
+        if task is not None and not task.done():
+            if force:
+                self._refresh_again.add(guild.id)
+            return task
+        task = asyncio.ensure_future(self._run_refresh(guild))
+        self._refresh_tasks[guild.id] = task
+        task.add_done_callback(lambda t: self._refresh_done(guild.id, t))
+        return task
+
+    async def _run_refresh(self, guild):
+        while True:
+            self._refresh_again.discard(guild.id)
+            await self.refresh_guild(guild)
+            if guild.id not in self._refresh_again:
+                return
+
+    def _refresh_done(self, guild_id, task):
+        if self._refresh_tasks.get(guild_id) is task:
+            del self._refresh_tasks[guild_id]
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"[ERROR] status refresh for guild {guild_id} failed: {task.exception()}")
+
+    @GroupCog.listener()
+    async def on_ark_config_change(self, guild):
+        # Dispatched by /setup, /status setstatusupdate and /status disable
+        self.request_refresh(guild, force=True)
+
+    async def _fetch_json(self, phase, path, token):
+        with timer(phase):
+            return await self.nitrado.get_json(path, token)
+
+    async def poll_server(self, token, sid):
+        # Fetch one server's current state; raises if Nitrado metadata is unavailable
+        mdata = await self._fetch_json("nitrado_metadata", f"/services/{sid}/gameservers", token)
+        gs = mdata.get("data", {}).get("gameserver", {}) or {}
+        q  = mdata.get("data", {}).get("query", {})      or {}
+        logging.debug(f"[DEBUG] query info for {sid}: {q}")
+        cfg = gs.get("settings", {}).get("config", {})
+        players = None
+        max_players = None
+        # Names are only fetched for servers someone keeps a player log for
+        roster = None
+        want_roster = str(sid) in self.roster_sids
+        host = q.get("address") or q.get("host")
+        port = q.get("port") or q.get("query_port")
+        if host and port:
+            address = (host, int(port))
             try:
-                # Only delete previous status message if it exists and is not the current one
-                if self.status_message:
-                    try:
-                        prev_msg = await channel.fetch_message(self.status_message.id)
-                        await prev_msg.delete()
-                    except Exception:
-                        pass
-            except Exception as prune_err:
-                logging.warning(f"[WARN] prune failed: {prune_err}")
+                with timer("a2s"):
+                    info = await self.a2s.info(address)
+                count_request("a2s", "info", "ok")
+                players = info.player_count
+                max_players = info.max_players
+            except Exception as a2s_err:
+                count_request("a2s", "info", type(a2s_err).__name__)
+                logging.warning(f"[WARN] A2S query failed for {sid}: {a2s_err}")
+            if want_roster and players is not None:
+                try:
+                    with timer("a2s_players"):
+                        roster = [p.name for p in await self.a2s.players(address)]
+                    count_request("a2s", "players", "ok")
+                except Exception as a2s_err:
+                    count_request("a2s", "players", type(a2s_err).__name__)
+                    logging.warning(f"[WARN] A2S player query failed for {sid}: {a2s_err}")
+        if players is None or (want_roster and roster is None):
             try:
-                self.status_message = await channel.send(embed=embed)
-                await self.status_message.pin()
-            except Exception as send_err:
-                logging.error(f"[ERROR] send/edit failed: {send_err}")
-                self.status_message = await channel.send(embed=embed)
+                pdata = await self._fetch_json("nitrado_players", f"/services/{sid}/players", token)
+                online = online_players(pdata)
+                if players is None:
+                    players = len(online)
+                if want_roster and roster is None:
+                    roster = [p.get("name") for p in online]
+            except NitradoError as players_err:
+                logging.warning(f"[WARN] /players fetch failed for {sid}: {players_err}")
+        return {
+            "status":      gs.get("status", "unknown"),
+            "map":         cfg.get("map") or gs.get("label") or "Unknown",
+            "server_name": cfg.get("server-name"),
+            "label":       gs.get("label"),
+            "players":     players if players is not None else 0,
+            "max_players": max_players if max_players is not None else gs.get("slots", "?"),
+            "roster":      roster,
+            "polled_at":   time.time(),
+        }
 
-    async def manual_status_update(self, guild):
+    async def guarded_poll(self, token, sid):
+        self.token_breaker.check(token)
+        self.server_breaker.check(str(sid))
+        try:
+            snapshot = await self.poll_server(token, sid)
+        except NitradoError as e:
+            if e.status in (401, 403):
+                if token not in self._rejected_tokens:
+                    self._rejected_tokens.add(token)
+                    self.token_breaker.failure(token)
+            else:
+                self.server_breaker.failure(str(sid))
+            raise
+        except Exception:
+            self.server_breaker.failure(str(sid))
+            raise
+        self.token_breaker.success(token)
+        self.server_breaker.success(str(sid))
+        self.last_good[str(sid)] = snapshot
+        return snapshot
+
+    def breaker_retry_in(self, token, sid):
+        return max(self.token_breaker.retry_in(token), self.server_breaker.retry_in(str(sid)))
+
+    async def fetch_status(self, token, sid, name_map):
+        snapshot = None
+        stale = False
+        if str(sid) in self.foreign_sids:
+            snapshot = self.remote_snapshots.get(str(sid)) or self.last_good.get(str(sid))
+            # The owner only publishes successful polls; past its expected
+            # interval (plus a tick and a refresh) the snapshot is out of date
+            max_age = self.poll_scheduler.expected_interval(sid) + STATUS_TICK_SECONDS + STATUS_GUILD_TIMEOUT
+            stale = snapshot is not None and time.time() - snapshot["polled_at"] > max_age
+        else:
+            try:
+                snapshot = await self.server_cache.get(
+                    (str(sid), token), lambda: self.guarded_poll(token, sid)
+                )
+            except BreakerOpen:
+                stale = True
+            except Exception as e:
+                logging.error(f"[ERROR] fetching data for {sid}: {e}")
+                stale = True
+            if stale:
+                snapshot = self.last_good.get(str(sid))
+        return self.render_server(sid, snapshot, name_map, stale)
+
+    def render_server(self, sid, snapshot, name_map, stale=False):
+        custom_name = name_map.get(str(sid))
+        if snapshot is None:
+            display_name = custom_name or f"Server {sid}"
+            map_name     = "Unknown"
+            players      = 0
+            max_players  = "?"
+            status       = "unknown"
+        else:
+            display_name = (
+                custom_name or
+                snapshot["server_name"] or
+                snapshot["label"] or
+                f"Server {sid}"
+            )
+            map_name    = snapshot["map"]
+            players     = snapshot["players"]
+            max_players = snapshot["max_players"]
+            status      = snapshot["status"]
+        s = status.lower()
+        if s in ("started", "online"):
+            status_emoji = "🟢"
+        elif s in ("restarting", "updating"):
+            status_emoji = "🟡"
+        else:
+            status_emoji = "🔴"
+        value = (
+            f"🆔 ID: `{sid}`\n"
+            f"🗺️ Map: `{map_name}`\n"
+            f"🧍 Players: `{players}/{max_players}`\n"
+            f"{status_emoji} Status: `{status}`"
+        )
+        if stale and snapshot is not None:
+            value += f"\n⚠️ Not reachable, last seen <t:{int(snapshot['polled_at'])}:R>"
+        return {
+            "name": display_name,
+            "value": value,
+            "status": s,
+            "stale": stale,
+            "players": players,
+            "max_players": max_players,
+            "snapshot": snapshot,
+        }
+
+    async def refresh_guild(self, guild):
         config     = load_config(guild.id)
         channel_id = config.get("status_channel_id")
+        server_ids = config.get("server_ids", [])
+        name_map   = config.get("server_names", {})
+
         if not channel_id:
+            if config.get("status_message_id"):
+                self.status_fingerprints.pop(guild.id, None)
+                self.posted_fingerprints.pop(guild.id, None)
+                self.writes.submit(
+                    config.get("status_message_channel_id"),
+                    lambda: self.retire_status(guild, load_config(guild.id)),
+                    key=("status", guild.id),
+                )
+            return
+        if not server_ids:
             return
+
         channel = guild.get_channel(channel_id)
+        if not channel:
+            return
+
+        token = config.get("nitrado_token")
+        if not token:
+            embed = discord.Embed(
+                title="📡 Ark Server Status",
+                color=discord.Color.red()
+            )
+            embed.description = "❌ No Nitrado token configured."
+        else:
+            results = await asyncio.gather(
+                *(self.fetch_status(token, sid, name_map) for sid in server_ids)
+            )
+            polled = []
+            for sid, result in zip(server_ids, results):
+                if str(sid) in self.foreign_sids:
+                    # Observed and recorded by the worker holding the lease
+                    continue
+                if self.poll_scheduler.observe(sid, result["status"]):
+                    if result["stale"]:
+                        # Nothing new was learned; come back when the breaker allows
+                        self.poll_scheduler.postpone(sid, self.breaker_retry_in(token, sid))
+                        continue
+                    self.timeseries.record(sid, result["players"], result["max_players"], result["status"])
+                    if result["snapshot"] is not None:
+                        self.coordinator.publish(str(sid), result["snapshot"])
+                        polled.append((sid, result["snapshot"]))
+            for sid, snapshot in polled:
+                self.track_players(sid, snapshot)
+            self.check_token_notice(guild, channel, config, token)
+            with timer("embed_build"):
+                embed = self.build_status_embed(results)
+        embed.description = f"Last changed: <t:{int(datetime.now(timezone.utc).timestamp())}:R>"
+        embed.set_footer(
+            text=f"Auto-updated every {STATUS_INTERVAL_MINUTES:g} minutes, "
+                 f"every {STATUS_POLL_TRANSITIONAL_SECONDS:g}s while restarting"
+        )
+        self.publish_status(guild, channel, embed)
+
+    def check_token_notice(self, guild, channel, config, token):
+        # Tell the guild once that its token keeps being rejected; the flag is
+        # cleared when the token works again or /setup saves a new one
+        state = self.token_breaker.state(token)
+        if state == CLOSED and config.get("token_rejected_notice"):
+            config = load_config(guild.id)
+            config.pop("token_rejected_notice", None)
+            save_config(guild.id, config)
+            return
+        if state != OPEN or config.get("token_rejected_notice"):
+            return
+        preview = config.get("nitrado_token_preview") or f"{token[:4]}••••"
+
+        async def send_notice():
+            try:
+                await channel.send(
+                    f"⚠️ Nitrado keeps rejecting the API token saved for this server (`{preview}`), "
+                    f"so status updates are paused. An administrator can run `/setup` with a new token to resume."
+                )
+                count_request("discord", "token_notice", "ok")
+            except discord.HTTPException as send_err:
+                count_request("discord", "token_notice", send_err.status)
+                logging.warning(f"[WARN] token notice failed for guild {guild.id}: {send_err}")
+                return
+            config = load_config(guild.id)
+            config["token_rejected_notice"] = True
+            save_config(guild.id, config)
+
+        self.writes.submit(channel.id, send_notice, key=("token_notice", guild.id))
+
+    def track_players(self, sid, snapshot):
+        roster = snapshot.get("roster")
+        if roster is None or str(sid) not in self.roster_sids:
+            return
+        delta = self.players.update(sid, roster)
+        if delta is None:
+            return
+        joined, left = delta
+        for guild_id in self.poll_scheduler.guilds_for(sid):
+            if guild_id in self.player_log_channels:
+                self.post_player_delta(guild_id, sid, joined, left)
+
+    def post_player_delta(self, guild_id, sid, joined, left):
+        guild = self.bot.get_guild(guild_id)
+        channel = guild.get_channel(self.player_log_channels[guild_id]) if guild else None
+        if not channel:
+            return
+        name = load_config(guild_id).get("server_names", {}).get(str(sid)) or f"Server {sid}"
+        lines = [f"👥 **{name}**"]
+        lines += [f"➕ `{player}` joined" for player in joined]
+        lines += [f"➖ `{player}` left" for player in left]
+        text = "\n".join(lines)
+        if len(text) > 2000:
+            text = text[:1990].rsplit("\n", 1)[0] + "\n…"
+
+        async def send_delta():
+            try:
+                await channel.send(text)
+                count_request("discord", "player_log", "ok")
+            except discord.HTTPException as send_err:
+                count_request("discord", "player_log", send_err.status)
+                logging.warning(f"[WARN] player log post failed for guild {guild_id}: {send_err}")
+
+        # Every delta is its own message, so these never coalesce
+        self.writes.submit(channel.id, send_delta)
+
+    def build_status_embed(self, results):
+        status_list = []
+        suspended_list = []
+        has_yellow = False
+        has_red = False
+        for result in results:
+            if result["status"] in ("started", "online"):
+                status_list.append(result)
+            elif result["status"] in ("restarting", "updating"):
+                status_list.append(result)
+                has_yellow = True
+            else:
+                suspended_list.append(result)
+                has_red = True
+        # Set embed color
+        if has_red:
+            embed_color = discord.Color.red()
+        elif has_yellow:
+            embed_color = discord.Color.yellow()
+        else:
+            embed_color = discord.Color.green()
+        embed = discord.Embed(
+            title="📡 Ark Server Status",
+            color=embed_color
+        )
+        # Add online/restarting servers first, then suspended/offline
+        all_results = status_list + suspended_list
+        for i, result in enumerate(all_results):
+            embed.add_field(name=result["name"], value=result["value"], inline=False)
+            # Only add blank field between servers, not after last
+            if i < len(all_results) - 1:
+                embed.add_field(name="\u200b", value="\u200b", inline=False)
+        return embed
+
+    def publish_status(self, guild, channel, embed):
+        # status_fingerprints holds the last embed handed to the write queue;
+        # a newer one replaces it in the queue if it hasn't been written yet
+        fingerprint = embed_fingerprint(embed)
+        if self.status_fingerprints.get(guild.id) == fingerprint:
+            count_request("discord", "publish", "skipped")
+            return
+        self.status_fingerprints[guild.id] = fingerprint
+        self.writes.submit(
+            channel.id,
+            lambda: self._write_status(guild, channel, embed, fingerprint),
+            key=("status", guild.id),
+        )
+
+    async def _write_status(self, guild, channel, embed, fingerprint):
+        with timer("discord_publish"):
+            ok = await self._publish_status(guild, channel, embed)
+        if ok:
+            self.posted_fingerprints[guild.id] = fingerprint
+        elif self.status_fingerprints.get(guild.id) == fingerprint:
+            # Let the next refresh try again
+            del self.status_fingerprints[guild.id]
+
+    async def _publish_status(self, guild, channel, embed):
+        # Returns whether the embed is now posted. A 429 is re-raised so the
+        # write queue backs the channel off and retries.
+        config     = load_config(guild.id)
+        message_id = config.get("status_message_id")
+        if message_id and config.get("status_message_channel_id") != channel.id:
+            # Status channel was moved; take down the old post
+            await self.retire_status(guild, config)
+            message_id = None
+        if message_id:
+            try:
+                await channel.get_partial_message(message_id).edit(embed=embed)
+                count_request("discord", "edit", "ok")
+                return True
+            except discord.NotFound:
+                count_request("discord", "edit", 404)
+                logging.info(f"ℹ️ Status message for guild {guild.id} is gone, posting a new one")
+            except discord.HTTPException as edit_err:
+                count_request("discord", "edit", edit_err.status)
+                if edit_err.status == 429:
+                    raise
+                logging.error(f"[ERROR] status edit failed for guild {guild.id}: {edit_err}")
+                return False
+
+        try:
+            message = await channel.send(embed=embed)
+            count_request("discord", "send", "ok")
+        except discord.HTTPException as send_err:
+            count_request("discord", "send", send_err.status)
+            if send_err.status == 429:
+                raise
+            logging.error(f"[ERROR] status send failed for guild {guild.id}: {send_err}")
+            return False
+        try:
+            await message.pin()
+            count_request("discord", "pin", "ok")
+        except discord.HTTPException as pin_err:
+            count_request("discord", "pin", pin_err.status)
+            logging.warning(f"[WARN] pin failed for guild {guild.id}: {pin_err}")
+
+        config = load_config(guild.id)
+        config["status_message_id"]         = message.id
+        config["status_message_channel_id"] = channel.id
+        save_config(guild.id, config)
+        return True
+
+    async def retire_status(self, guild, config):
+        message_id = config.pop("status_message_id", None)
+        channel_id = config.pop("status_message_channel_id", None)
+        if not message_id:
+            return
+        channel = guild.get_channel(channel_id) if channel_id else None
         if channel:
-            await self.update_status_loop.callback(self)
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.HTTPException as delete_err:
+                logging.warning(f"[WARN] could not remove old status message in guild {guild.id}: {delete_err}")
+        save_config(guild.id, config)
 
     @app_commands.command(name="setstatusupdate", description="Start auto status updates in a channel.")
     async def setstatusupdate(self, interaction: discord.Interaction, channel_name: str):
@@ -192,8 +696,11 @@ class SetStatusUpdateCog(GroupCog, name="status"):
             config["status_channel_id"] = new_ch.id
             msg = f"✅ Created channel `{channel_name}`."
         save_config(guild.id, config)
+        # Force a fresh post in the (possibly new) channel
+        self.status_fingerprints.pop(guild.id, None)
+        self.posted_fingerprints.pop(guild.id, None)
         await interaction.response.send_message(msg, ephemeral=True)
-        await self.manual_status_update(guild)
+        self.bot.dispatch("ark_config_change", guild)
 
     @app_commands.command(name="view", description="View current status update channel.")
     async def view_status(self, interaction: discord.Interaction):
@@ -206,6 +713,51 @@ class SetStatusUpdateCog(GroupCog, name="status"):
         else:
             await interaction.response.send_message("⚠️ No status channel configured.", ephemeral=True)
 
+    @app_commands.command(name="history", description="Show daily player trends for linked servers.")
+    async def history(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 14] = 7):
+        config     = load_config(interaction.guild.id)
+        server_ids = config.get("server_ids", [])
+        name_map   = config.get("server_names", {})
+        if not server_ids:
+            await interaction.response.send_message("⚠️ No servers linked. Run `/setup` first.", ephemeral=True)
+            return
+
+        rollups = await asyncio.to_thread(
+            lambda: {sid: self.timeseries.daily(sid, days) for sid in server_ids[:25]}
+        )
+        title = f"📈 Player history (last {days} day(s))"
+        embeds = [discord.Embed(title=title, color=discord.Color.blurple())]
+        for sid in server_ids[:25]:
+            lines = [
+                f"`{datetime.fromtimestamp(r.day * 86400, timezone.utc):%a %d %b}` "
+                f"peak **{r.peak}** · avg {r.average:.1f} · up {r.uptime:.0%}"
+                for r in rollups[sid]
+            ]
+            name = name_map.get(str(sid)) or f"Server {sid}"
+            value = "\n".join(lines) or "No data yet."
+            if len(embeds[-1]) + len(name) + len(value) > EMBED_MAX_CHARS:
+                # Discord rejects embeds over 6000 characters; continue in another message
+                embeds.append(discord.Embed(title=title, color=discord.Color.blurple()))
+            embeds[-1].add_field(name=name, value=value, inline=False)
+        await interaction.response.send_message(embed=embeds[0], ephemeral=True)
+        for embed in embeds[1:]:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="playerlog", description="Post player joins and leaves to a channel (omit to turn off).")
+    async def playerlog(self, interaction: discord.Interaction, channel: discord.TextChannel = None):
+        config = load_config(interaction.guild.id)
+        if channel:
+            config["player_log_channel_id"] = channel.id
+            msg = f"✅ Player joins and leaves will be posted in {channel.mention}."
+        elif "player_log_channel_id" in config:
+            del config["player_log_channel_id"]
+            msg = "🛑 Player log disabled."
+        else:
+            await interaction.response.send_message("⚠️ No player log channel configured.", ephemeral=True)
+            return
+        save_config(interaction.guild.id, config)
+        await interaction.response.send_message(msg, ephemeral=True)
+
     @app_commands.command(name="disable", description="Disable status updates.")
     async def disable_status(self, interaction: discord.Interaction):
         config = load_config(interaction.guild.id)
@@ -213,6 +765,7 @@ class SetStatusUpdateCog(GroupCog, name="status"):
             del config["status_channel_id"]
             save_config(interaction.guild.id, config)
             await interaction.response.send_message("🛑 Status updates disabled.", ephemeral=True)
+            self.bot.dispatch("ark_config_change", interaction.guild)
         else:
             await interaction.response.send_message("⚠️ No status channel to disable.", ephemeral=True)
 
@@ -3,9 +3,12 @@
 import discord
 from discord import app_commands
 from discord.ext.commands import Cog
+from discord.ext import tasks
 from discord.ui import Modal, TextInput
 from utils.config import load_config, save_config
-import aiohttp
+from utils.nitrado import get_client, NitradoError
+from settings import SERVICE_SYNC_MINUTES
+import logging
 
 class NitradoSetupModal(Modal, title="ARK Server Setup - Nitrado Token"):
     def __init__(self, interaction: discord.Interaction):
@@ -25,72 +28,117 @@ class NitradoSetupModal(Modal, title="ARK Server Setup - Nitrado Token"):
         guild_id = self.interaction.guild.id
         guild_name = self.interaction.guild.name
 
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json"
+        preview = token[:4] + "••••" + token[-4:]
+        client = get_client()
+        try:
+            ark_servers = await client.ark_servers(token)
+        except NitradoError as e:
+            logging.warning(f"[WARN] Nitrado rejected token {preview} for guild {guild_id}: {e}")
+            await interaction.response.send_message(f"❌ Invalid token. {e}", ephemeral=True)
+            return
+        except Exception as e:
+            logging.error(f"[ERROR] could not validate Nitrado token for guild {guild_id}: {e}")
+            await interaction.response.send_message(
+                "❌ An error occurred while validating the token.", ephemeral=True
+            )
+            return
+
+        # extract names and ids
+        ark_server_names = [name for _, name in ark_servers]
+        ark_server_ids   = [sid  for sid, _ in ark_servers]
+
+        # load existing config
+        config = load_config(guild_id)
+        config["nitrado_token"]         = token
+        config["nitrado_token_preview"] = preview
+        config.pop("token_rejected_notice", None)
+        config["linked_servers"]        = ark_server_names
+        config["server_ids"]            = ark_server_ids
+
+        # add mapping of id -> custom server name
+        config["server_names"] = {
+            sid: name for sid, name in zip(ark_server_ids, ark_server_names)
         }
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get("https://api.nitrado.net/services", headers=headers) as resp:
-                    print(f"[DEBUG] Token submitted: {token[:4]}••••{token[-4:]}")
-                    print(f"[DEBUG] API response status: {resp.status}")
-                    raw = await resp.text()
-                    print(f"[DEBUG] Raw API response: {raw}")
-
-                    if resp.status == 200:
-                        data = await resp.json()
-                        services = data.get("data", {}).get("services", [])
-
-                        ark_servers = [
-                            svc for svc in services
-                            if svc.get("type") == "gameserver"
-                               and "ark" in svc.get("details", {}).get("game", "").lower()
-                        ]
-
-                        # extract names and ids
-                        ark_server_names = [svc["details"]["name"] for svc in ark_servers]
-                        ark_server_ids   = [str(svc["id"])            for svc in ark_servers]
-
-                        # load existing config
-                        config = load_config(guild_id)
-                        config["nitrado_token"]         = token
-                        config["nitrado_token_preview"] = token[:4] + "••••" + token[-4:]
-                        config["linked_servers"]        = ark_server_names
-                        config["server_ids"]            = ark_server_ids
-
-                        # add mapping of id -> custom server name
-                        config["server_names"] = {
-                            sid: name for sid, name in zip(ark_server_ids, ark_server_names)
-                        }
-
-                        # save with guild metadata
-                        save_config(guild_id, config, guild_name=guild_name)
-
-                        # build response message
-                        msg = "✅ Token accepted and saved.\n\n"
-                        if ark_server_names:
-                            msg += "🎮 Linked ARK Servers:\n"
-                            msg += "\n".join(f"- {name} (ID: {sid})"
-                                              for sid, name in zip(ark_server_ids, ark_server_names))
-                        else:
-                            msg += "⚠️ No ARK servers found on this account."
-
-                        await interaction.response.send_message(msg, ephemeral=True)
-                    else:
-                        await interaction.response.send_message(
-                            f"❌ Invalid token. Response code: {resp.status}\nCheck console for details.",
-                            ephemeral=True
-                        )
-            except Exception as e:
-                print(f"[ERROR] Exception during Nitrado request: {e}")
-                await interaction.response.send_message(
-                    "❌ An error occurred while validating the token.", ephemeral=True
-                )
+        # save with guild metadata
+        save_config(guild_id, config, guild_name=guild_name)
+
+        # build response message
+        msg = "✅ Token accepted and saved.\n\n"
+        if ark_server_names:
+            msg += "🎮 Linked ARK Servers:\n"
+            msg += "\n".join(f"- {name} (ID: {sid})"
+                              for sid, name in zip(ark_server_ids, ark_server_names))
+        else:
+            msg += "⚠️ No ARK servers found on this account."
+
+        await interaction.response.send_message(msg, ephemeral=True)
+        interaction.client.dispatch("ark_config_change", interaction.guild)
+
+def reconcile_servers(config, ark_servers):
+    # Apply the account's current ARK servers to a guild config. Custom names
+    # for servers that are still there are kept. Returns (added, removed).
+    current = [str(sid) for sid in config.get("server_ids", [])]
+    listed  = dict(ark_servers)
+    added   = [sid for sid in listed if sid not in current]
+    removed = [sid for sid in current if sid not in listed]
+    if not added and not removed:
+        return added, removed
+
+    names = {sid: name for sid, name in config.get("server_names", {}).items() if sid in listed}
+    for sid in added:
+        names[sid] = listed[sid]
+    server_ids = [sid for sid in current if sid in listed] + added
+    config["server_ids"]     = server_ids
+    config["server_names"]   = {sid: names[sid] for sid in server_ids}
+    config["linked_servers"] = [listed[sid] for sid in server_ids]
+    return added, removed
 
 class SetupCog(Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.sync_services_loop.start()
+
+    def cog_unload(self):
+        self.sync_services_loop.cancel()
+
+    @tasks.loop(minutes=SERVICE_SYNC_MINUTES)
+    async def sync_services_loop(self):
+        # Pick up servers added to or removed from each linked Nitrado account.
+        # The /services listing is a conditional GET, so an unchanged account
+        # costs a 304 and no parsing.
+        await self.bot.wait_until_ready()
+        if self.sync_services_loop.current_loop == 0:
+            # Right after startup the first status poll needs the per-token
+            # rate limit more than we do; reconcile from the next pass on
+            return
+        client   = get_client()
+        listings = {}
+        for guild in list(self.bot.guilds):
+            config = load_config(guild.id)
+            token  = config.get("nitrado_token")
+            if not token:
+                continue
+            if token not in listings:
+                try:
+                    listings[token] = await client.ark_servers(token)
+                except Exception as e:
+                    logging.warning(f"[WARN] service sync failed for guild {guild.id}: {e}")
+                    listings[token] = None
+            ark_servers = listings[token]
+            if ark_servers is None:
+                # Never unlink servers because of a failed or rejected listing
+                continue
+
+            added, removed = reconcile_servers(config, ark_servers)
+            if not added and not removed:
+                continue
+            save_config(guild.id, config, guild_name=guild.name)
+            logging.info(
+                f"🔄 Servers for guild {guild.id} changed on Nitrado: "
+                f"+{len(added)} {added} -{len(removed)} {removed}"
+            )
+            self.bot.dispatch("ark_config_change", guild)
 
     @app_commands.command(
         name="setup",
@@ -0,0 +1,91 @@
+import logging
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+
+from settings import WORKER_COUNT, SHARD_COUNT
+from utils.coordinator import serve
+
+logging.basicConfig(level=logging.INFO)
+
+COORDINATOR_ADDRESS = os.getenv("COORDINATOR_ADDRESS", "127.0.0.1:47017")
+RESTART_BACKOFF_MAX = 60
+# A worker that ran this long before exiting starts its backoff over
+RESTART_STABLE_SECONDS = 600
+
+def shard_slices(shard_count, worker_count):
+    # Round-robin so every worker gets an even share of the shards
+    return [list(range(i, shard_count, worker_count)) for i in range(worker_count)]
+
+def spawn(worker_id, shard_ids, authkey):
+    env = dict(os.environ)
+    env.update({
+        "WORKER_ID": str(worker_id),
+        "SHARD_IDS": ",".join(map(str, shard_ids)),
+        "SHARD_COUNT": str(SHARD_COUNT),
+        "COORDINATOR_ADDRESS": COORDINATOR_ADDRESS,
+        "COORDINATOR_AUTHKEY": authkey.hex(),
+    })
+    logging.info(f"🚀 Starting worker {worker_id} with shards {shard_ids}")
+    return subprocess.Popen([sys.executable, "bot.py"], env=env)
+
+def main():
+    if WORKER_COUNT <= 1 and SHARD_COUNT <= 1:
+        # Nothing to coordinate; behave exactly like `python bot.py`
+        os.execv(sys.executable, [sys.executable, "bot.py"])
+
+    worker_count = min(WORKER_COUNT, SHARD_COUNT)
+    authkey = secrets.token_bytes(16)
+    leases = serve(COORDINATOR_ADDRESS, authkey)
+    logging.info(f"🧭 Coordinator listening on {COORDINATOR_ADDRESS}")
+
+    slices = shard_slices(SHARD_COUNT, worker_count)
+    workers = {i: spawn(i, slices[i], authkey) for i in range(worker_count)}
+    started_at = {i: time.monotonic() for i in range(worker_count)}
+    failures = {i: 0 for i in range(worker_count)}
+    # Crashed workers waiting out their backoff, with when to start them
+    restart_at = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for proc in workers.values():
+            proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        time.sleep(1)
+        now = time.monotonic()
+        for worker_id, proc in list(workers.items()):
+            if worker_id in restart_at:
+                if restart_at[worker_id] <= now and not stopping:
+                    del restart_at[worker_id]
+                    workers[worker_id] = spawn(worker_id, slices[worker_id], authkey)
+                    started_at[worker_id] = now
+                continue
+            code = proc.poll()
+            if code is None or stopping:
+                continue
+            # Hand its servers to whichever worker claims them next
+            leases.release_worker(worker_id)
+            if now - started_at[worker_id] >= RESTART_STABLE_SECONDS:
+                failures[worker_id] = 0
+            failures[worker_id] += 1
+            delay = min(RESTART_BACKOFF_MAX, 2 ** failures[worker_id])
+            logging.error(f"⚠️ Worker {worker_id} exited with {code}; restarting in {delay}s")
+            restart_at[worker_id] = now + delay
+
+    for proc in workers.values():
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,87 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+# Status poller
+STATUS_INTERVAL_MINUTES = float(os.getenv("STATUS_INTERVAL_MINUTES", "10"))
+STATUS_CONCURRENCY = int(os.getenv("STATUS_CONCURRENCY", "8"))
+STATUS_GUILD_TIMEOUT = float(os.getenv("STATUS_GUILD_TIMEOUT", "120"))
+
+# Nitrado API
+NITRADO_API_BASE = os.getenv("NITRADO_API_BASE", "https://api.nitrado.net")
+NITRADO_TIMEOUT = float(os.getenv("NITRADO_TIMEOUT", "15"))
+NITRADO_RATE_PER_SECOND = float(os.getenv("NITRADO_RATE_PER_SECOND", "4"))
+NITRADO_MAX_RETRIES = int(os.getenv("NITRADO_MAX_RETRIES", "3"))
+
+# Shared Nitrado response cache (seconds). Freshness is driven by the poll
+# scheduler, which invalidates servers as they come due; the TTL is only a
+# backstop and should outlive the longest poll interval.
+STATUS_CACHE_TTL = float(os.getenv("STATUS_CACHE_TTL", "2400"))
+STATUS_CACHE_STALE_TTL = float(os.getenv("STATUS_CACHE_STALE_TTL", "120"))
+STATUS_CACHE_MAX_ENTRIES = int(os.getenv("STATUS_CACHE_MAX_ENTRIES", "5000"))
+
+# Guild config storage: "json" (configs/<guild_id>.json) or "sqlite" (configs/configs.sqlite3)
+CONFIG_BACKEND = os.getenv("CONFIG_BACKEND", "json").lower()
+CONFIG_FLUSH_DELAY = float(os.getenv("CONFIG_FLUSH_DELAY", "1.0"))
+
+# Adaptive per-server polling (seconds unless noted)
+STATUS_TICK_SECONDS = float(os.getenv("STATUS_TICK_SECONDS", "15"))
+STATUS_POLL_TRANSITIONAL_SECONDS = float(os.getenv("STATUS_POLL_TRANSITIONAL_SECONDS", "30"))
+STATUS_POLL_CHANGED_SECONDS = float(os.getenv("STATUS_POLL_CHANGED_SECONDS", "60"))
+STATUS_POLL_STABLE_MAX_SECONDS = float(os.getenv("STATUS_POLL_STABLE_MAX_SECONDS", str(STATUS_INTERVAL_MINUTES * 60)))
+STATUS_POLL_SUSPENDED_SECONDS = float(os.getenv("STATUS_POLL_SUSPENDED_SECONDS", "1800"))
+STATUS_GLOBAL_POLLS_PER_MINUTE = int(os.getenv("STATUS_GLOBAL_POLLS_PER_MINUTE", "240"))
+STATUS_GUILD_POLLS_PER_TICK = int(os.getenv("STATUS_GUILD_POLLS_PER_TICK", "10"))
+# Poll intervals for servers of premium (Patreon) guilds are multiplied by this
+STATUS_PREMIUM_INTERVAL_FACTOR = float(os.getenv("STATUS_PREMIUM_INTERVAL_FACTOR", "0.5"))
+
+# Outbound Discord writes: global rate and concurrency, and the minimum gap
+# between two writes to the same channel (seconds)
+DISCORD_WRITES_PER_SECOND = float(os.getenv("DISCORD_WRITES_PER_SECOND", "25"))
+DISCORD_WRITE_CONCURRENCY = int(os.getenv("DISCORD_WRITE_CONCURRENCY", "8"))
+DISCORD_CHANNEL_WRITE_INTERVAL = float(os.getenv("DISCORD_CHANNEL_WRITE_INTERVAL", "1.0"))
+
+# Player count history
+TIMESERIES_RAW_RETENTION_DAYS = int(os.getenv("TIMESERIES_RAW_RETENTION_DAYS", "7"))
+TIMESERIES_DAILY_RETENTION_DAYS = int(os.getenv("TIMESERIES_DAILY_RETENTION_DAYS", "365"))
+
+# Prometheus metrics endpoint (set METRICS_PORT=0 to disable)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Sharded deployment (set by launcher.py for each worker process)
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", str(WORKER_COUNT)))
+WORKER_ID = int(os.getenv("WORKER_ID", "0"))
+SHARD_IDS = [int(s) for s in os.getenv("SHARD_IDS", "").split(",") if s.strip()] or None
+COORDINATOR_ADDRESS = os.getenv("COORDINATOR_ADDRESS", "")
+COORDINATOR_AUTHKEY = bytes.fromhex(os.getenv("COORDINATOR_AUTHKEY", ""))
+COORDINATOR_LEASE_SECONDS = float(os.getenv("COORDINATOR_LEASE_SECONDS", "3600"))
+
+# How often linked servers are reconciled with each token's Nitrado account
+SERVICE_SYNC_MINUTES = float(os.getenv("SERVICE_SYNC_MINUTES", "30"))
+
+# Circuit breakers for dead service ids and rejected tokens: consecutive
+# failures before opening, then the first and longest backoff (seconds)
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+BREAKER_BASE_SECONDS = float(os.getenv("BREAKER_BASE_SECONDS", "60"))
+BREAKER_MAX_SECONDS = float(os.getenv("BREAKER_MAX_SECONDS", "3600"))
+
+# Patreon linking. The OAuth callback is served by the bot itself (worker 0)
+# on OAUTH_HOST:OAUTH_PORT; leave PATREON_CLIENT_ID empty to disable it.
+# PATREON_CAMPAIGN_ID is required: only pledges to that campaign count.
+PATREON_CLIENT_ID = os.getenv("PATREON_CLIENT_ID", "")
+PATREON_CLIENT_SECRET = os.getenv("PATREON_CLIENT_SECRET", "")
+PATREON_REDIRECT_URI = os.getenv("PATREON_REDIRECT_URI", "http://localhost:8080/patreon/callback")
+PATREON_CAMPAIGN_ID = os.getenv("PATREON_CAMPAIGN_ID", "")
+PATREON_PREMIUM_CENTS = int(os.getenv("PATREON_PREMIUM_CENTS", "300"))
+PATREON_RECHECK_HOURS = float(os.getenv("PATREON_RECHECK_HOURS", "6"))
+OAUTH_HOST = os.getenv("OAUTH_HOST", "0.0.0.0")
+OAUTH_PORT = int(os.getenv("OAUTH_PORT", "8080"))
+
+# Warm start: last known server snapshots and posted embeds, reloaded on boot
+WARM_START_PATH = os.getenv("WARM_START_PATH", os.path.join("data", "warm_start.json.gz"))
+WARM_START_SAVE_SECONDS = float(os.getenv("WARM_START_SAVE_SECONDS", "60"))
+WARM_START_MAX_AGE_HOURS = float(os.getenv("WARM_START_MAX_AGE_HOURS", "24"))
+# Servers overdue after a restart are spread over at least this many seconds
+WARM_START_SPREAD_SECONDS = float(os.getenv("WARM_START_SPREAD_SECONDS", "120"))
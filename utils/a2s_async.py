@@ -0,0 +1,353 @@
+import asyncio
+import itertools
+import logging
+import socket
+import struct
+
+# Valve A2S over asyncio UDP. One engine multiplexes any number of queries
+# over a small pool of sockets; replies are routed back by source address,
+# so each socket carries at most one in-flight query per server.
+
+SIMPLE_HEADER = b"\xFF\xFF\xFF\xFF"
+MULTI_HEADER = b"\xFF\xFF\xFF\xFE"
+
+A2S_INFO = 0x54         # 'T'
+S2A_INFO = 0x49         # 'I'
+A2S_PLAYER = 0x55       # 'U'
+S2A_PLAYER = 0x44       # 'D'
+S2C_CHALLENGE = 0x41    # 'A'
+
+INFO_PAYLOAD = b"Source Engine Query\x00"
+# A2S_PLAYER always carries a challenge; -1 asks the server to issue one
+NO_CHALLENGE = b"\xFF\xFF\xFF\xFF"
+
+DEFAULT_TIMEOUT = 3.0
+DEFAULT_POOL_SIZE = 4
+
+
+class A2SError(Exception):
+    pass
+
+
+class A2STimeout(A2SError, asyncio.TimeoutError):
+    pass
+
+
+class _Reader:
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.offset = offset
+
+    def byte(self):
+        value = self.data[self.offset]
+        self.offset += 1
+        return value
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values[0] if len(values) == 1 else values
+
+    def string(self):
+        end = self.data.index(b"\x00", self.offset)
+        value = self.data[self.offset:end].decode("utf-8", errors="replace")
+        self.offset = end + 1
+        return value
+
+    def remaining(self):
+        return len(self.data) - self.offset
+
+
+class A2SInfo:
+    # Attribute names match the python-a2s SourceInfo fields used by the cogs
+    __slots__ = (
+        "protocol", "server_name", "map_name", "folder", "game", "app_id",
+        "player_count", "max_players", "bot_count", "server_type", "platform",
+        "password_protected", "vac_enabled", "version", "port", "keywords", "ping",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def __repr__(self):
+        return (f"A2SInfo(server_name={self.server_name!r}, map_name={self.map_name!r}, "
+                f"players={self.player_count}/{self.max_players})")
+
+
+class A2SPlayer:
+    __slots__ = ("index", "name", "score", "duration")
+
+    def __init__(self, index, name, score, duration):
+        self.index = index
+        self.name = name
+        self.score = score
+        self.duration = duration
+
+    def __repr__(self):
+        return f"A2SPlayer(name={self.name!r}, duration={self.duration:.0f}s)"
+
+
+class A2SPlayers(list):
+    # List of A2SPlayer; a list subclass so the engine can attach .ping
+    ping = None
+
+
+def parse_players(data):
+    r = _Reader(data, 1)
+    players = A2SPlayers()
+    count = r.byte()
+    for _ in range(count):
+        if r.remaining() < 10:
+            break
+        index = r.byte()
+        name = r.string()
+        score, duration = r.unpack("<lf")
+        players.append(A2SPlayer(index, name, score, duration))
+    return players
+
+
+def parse_info(data):
+    r = _Reader(data, 1)
+    info = A2SInfo(
+        protocol=r.byte(),
+        server_name=r.string(),
+        map_name=r.string(),
+        folder=r.string(),
+        game=r.string(),
+        app_id=r.unpack("<H"),
+        player_count=r.byte(),
+        max_players=r.byte(),
+        bot_count=r.byte(),
+        server_type=chr(r.byte()),
+        platform=chr(r.byte()),
+        password_protected=bool(r.byte()),
+        vac_enabled=bool(r.byte()),
+    )
+    info.version = r.string() if r.remaining() else ""
+    if r.remaining():
+        edf = r.byte()
+        if edf & 0x80:
+            info.port = r.unpack("<H")
+        if edf & 0x10:
+            r.unpack("<Q")
+        if edf & 0x40:
+            r.unpack("<H")
+            r.string()
+        if edf & 0x20:
+            info.keywords = r.string()
+    return info
+
+
+class _Query:
+    def __init__(self, addr, request_type, payload, response_type, parser, challenge=b""):
+        self.addr = addr
+        self.request_type = request_type
+        self.payload = payload
+        self.response_type = response_type
+        self.parser = parser
+        self.challenge = challenge
+        self.future = asyncio.get_running_loop().create_future()
+        self.sent_at = 0.0
+        # Split response being reassembled: its id and {number: payload}
+        self.split_id = None
+        self.fragments = {}
+
+    def packet(self):
+        return SIMPLE_HEADER + bytes([self.request_type]) + self.payload + self.challenge
+
+    def add_fragment(self, data):
+        # Source engine split packet: id, total, number, size, then a slice of
+        # the full reply. Busy servers send A2S_PLAYER this way once the
+        # roster outgrows one datagram. Returns the whole reply once every
+        # part is in, otherwise None.
+        split_id, total, number, _ = struct.unpack_from("<LBBH", data, 4)
+        if split_id & 0x80000000:
+            raise A2SError("compressed responses are not supported")
+        if number >= total:
+            raise A2SError(f"part {number} of {total}")
+        if split_id != self.split_id:
+            # A different reply, e.g. to the retransmit; start over
+            self.split_id = split_id
+            self.fragments = {}
+        self.fragments[number] = data[12:]
+        if len(self.fragments) < total:
+            return None
+        payload = b"".join(self.fragments[i] for i in range(total))
+        self.split_id = None
+        self.fragments = {}
+        return payload
+
+
+class _A2SProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.pending = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, query):
+        query.sent_at = asyncio.get_running_loop().time()
+        self.transport.sendto(query.packet(), query.addr)
+
+    def datagram_received(self, data, addr):
+        query = self.pending.get(addr[:2])
+        if query is None or query.future.done():
+            return
+        if data[:4] == MULTI_HEADER:
+            try:
+                data = query.add_fragment(data)
+            except (struct.error, A2SError) as e:
+                query.future.set_exception(A2SError(f"malformed split A2S response: {e}"))
+                return
+            if data is None:
+                return
+        if data[:4] != SIMPLE_HEADER or len(data) < 5:
+            return
+        kind = data[4]
+        if kind == S2C_CHALLENGE:
+            query.challenge = data[5:9]
+            self.send(query)
+        elif kind == query.response_type:
+            try:
+                result = query.parser(data[4:])
+                result.ping = asyncio.get_running_loop().time() - query.sent_at
+                query.future.set_result(result)
+            except Exception as e:
+                query.future.set_exception(A2SError(f"malformed A2S response: {e}"))
+
+    def error_received(self, exc):
+        logging.debug(f"[DEBUG] A2S socket error: {exc}")
+
+    def connection_lost(self, exc):
+        for query in self.pending.values():
+            if not query.future.done():
+                query.future.set_exception(A2SError("A2S socket closed"))
+        self.pending.clear()
+
+
+class A2SQueryEngine:
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._pool = []
+        self._pool_lock = asyncio.Lock()
+        self._rr = itertools.count()
+        self._resolved = {}
+        # (addr, request_type) -> future, so duplicate lookups share one query
+        self._inflight = {}
+
+    async def _ensure_pool(self):
+        if self._pool:
+            return
+        async with self._pool_lock:
+            if self._pool:
+                return
+            loop = asyncio.get_running_loop()
+            for _ in range(self.pool_size):
+                _, protocol = await loop.create_datagram_endpoint(
+                    _A2SProtocol, local_addr=("0.0.0.0", 0), family=socket.AF_INET
+                )
+                self._pool.append(protocol)
+
+    async def _resolve(self, host, port):
+        key = (host, port)
+        addr = self._resolved.get(key)
+        if addr is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM
+            )
+            addr = infos[0][4][:2]
+            self._resolved[key] = addr
+        return addr
+
+    async def _acquire(self, addr):
+        # Pick the next socket that isn't already talking to this server
+        while True:
+            start = next(self._rr)
+            for i in range(len(self._pool)):
+                protocol = self._pool[(start + i) % len(self._pool)]
+                if addr not in protocol.pending:
+                    return protocol
+            busy = [p.pending[addr].future for p in self._pool if addr in p.pending]
+            await asyncio.wait(busy, return_when=asyncio.FIRST_COMPLETED)
+
+    async def _run(self, address, request_type, payload, response_type, parser, timeout, challenge):
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        await self._ensure_pool()
+        addr = await self._resolve(*address)
+        protocol = await self._acquire(addr)
+        query = _Query(addr, request_type, payload, response_type, parser, challenge)
+        protocol.pending[addr] = query
+        try:
+            protocol.send(query)
+            # One retransmit halfway through the deadline covers a dropped datagram
+            done, _ = await asyncio.wait({query.future}, timeout=timeout / 2)
+            if not done and not query.future.done():
+                protocol.send(query)
+            remaining = deadline - loop.time()
+            try:
+                return await asyncio.wait_for(asyncio.shield(query.future), max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise A2STimeout(f"A2S query to {address[0]}:{address[1]} timed out") from None
+        finally:
+            if protocol.pending.get(addr) is query:
+                del protocol.pending[addr]
+            if not query.future.done():
+                query.future.cancel()
+
+    async def _coalesced(self, address, request_type, response_type, payload, parser, timeout, challenge=b""):
+        key = (tuple(address), request_type)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._run(address, request_type, payload, response_type, parser, timeout, challenge)
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def info(self, address, timeout=None):
+        return await self._coalesced(address, A2S_INFO, S2A_INFO, INFO_PAYLOAD, parse_info, timeout)
+
+    async def players(self, address, timeout=None):
+        return await self._coalesced(
+            address, A2S_PLAYER, S2A_PLAYER, b"", parse_players, timeout, challenge=NO_CHALLENGE
+        )
+
+    async def info_many(self, addresses, timeout=None):
+        # Yields (address, result) as each reply lands; result is an A2SInfo or the exception
+        async def one(address):
+            try:
+                return address, await self.info(address, timeout)
+            except Exception as e:
+                return address, e
+
+        for task in asyncio.as_completed([one(tuple(a)) for a in addresses]):
+            yield await task
+
+    def close(self):
+        for protocol in self._pool:
+            if protocol.transport:
+                protocol.transport.close()
+        self._pool.clear()
+
+
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = A2SQueryEngine()
+    return _engine
+
+
+def close_engine():
+    global _engine
+    if _engine is not None:
+        _engine.close()
+        _engine = None
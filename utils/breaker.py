@@ -0,0 +1,94 @@
+import logging
+import time
+
+from settings import BREAKER_THRESHOLD, BREAKER_BASE_SECONDS, BREAKER_MAX_SECONDS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class BreakerOpen(Exception):
+    def __init__(self, breaker, key, retry_in):
+        super().__init__(f"{breaker} breaker open, retry in {retry_in:.0f}s")
+        self.breaker = breaker
+        self.retry_in = retry_in
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "trips", "open_until")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+
+
+class CircuitBreakers:
+    # One circuit per key. `threshold` failures in a row open it; while open
+    # every call is refused. Once the backoff runs out it goes half-open and
+    # lets calls through: the first success closes it, the first failure
+    # re-opens it for twice as long (capped at max_backoff).
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, base=BREAKER_BASE_SECONDS,
+                 max_backoff=BREAKER_MAX_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.base = base
+        self.max_backoff = max_backoff
+        self._circuits = {}
+
+    def __len__(self):
+        return len(self._circuits)
+
+    def state(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            return CLOSED
+        if circuit.state == OPEN and time.monotonic() >= circuit.open_until:
+            circuit.state = HALF_OPEN
+        return circuit.state
+
+    def retry_in(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None or circuit.state != OPEN:
+            return 0.0
+        return max(0.0, circuit.open_until - time.monotonic())
+
+    def check(self, key):
+        # Raises BreakerOpen instead of letting the call go out
+        if self.state(key) == OPEN:
+            raise BreakerOpen(self.name, key, self.retry_in(key))
+
+    def success(self, key):
+        circuit = self._circuits.pop(key, None)
+        if circuit is not None and circuit.state != CLOSED:
+            logging.info(f"✅ {self.name} breaker closed for {self.describe(key)}")
+
+    def failure(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit()
+        if self.state(key) == OPEN:
+            # A call that was already in flight when the circuit opened
+            return OPEN
+        circuit.failures += 1
+        if circuit.state == HALF_OPEN or circuit.failures >= self.threshold:
+            backoff = min(self.max_backoff, self.base * 2 ** circuit.trips)
+            circuit.trips += 1
+            circuit.state = OPEN
+            circuit.open_until = time.monotonic() + backoff
+            logging.warning(f"[WARN] {self.name} breaker open for {self.describe(key)}, next try in {backoff:.0f}s")
+        return circuit.state
+
+    def open_count(self):
+        return sum(1 for key in self._circuits if self.state(key) == OPEN)
+
+    def retain(self, keys):
+        for key in [key for key in self._circuits if key not in keys]:
+            del self._circuits[key]
+
+    def describe(self, key):
+        # Keys can be API tokens; never log those in full
+        key = str(key)
+        return key if key.isdigit() else f"{key[:4]}••••"
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value, stored_at):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class TTLCache:
+    # Shared async cache: LRU-bounded, one in-flight load per key, and entries
+    # past their TTL are still served for stale_ttl seconds while a background
+    # refresh replaces them.
+    def __init__(self, name, ttl, stale_ttl=0.0, max_entries=1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, value):
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key, value):
+        self._store(key, value)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def _load(self, key, loader):
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                try:
+                    value = await loader()
+                    self._store(key, value)
+                    return value
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = self._inflight[key] = asyncio.ensure_future(run())
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def _refresh_in_background(self, key, loader):
+        if key in self._inflight:
+            return
+
+        def done(task):
+            if not task.cancelled() and task.exception() is not None:
+                logging.warning(f"[WARN] {self.name} background refresh failed: {task.exception()}")
+
+        self._load(key, loader).add_done_callback(done)
+
+    async def get(self, key, loader):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                self.hits += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader)
+                return entry.value
+        self.misses += 1
+        # Shield so one cancelled caller doesn't cancel the load for the others
+        return await asyncio.shield(self._load(key, loader))
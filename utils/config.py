@@ -1,42 +1,202 @@
+import atexit
+import copy
+import datetime
+import glob
 import json
+import logging
 import os
-import datetime
+import sqlite3
 import threading
+import time
+
+from settings import CONFIG_BACKEND, CONFIG_FLUSH_DELAY
 
 CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', 'configs')
 os.makedirs(CONFIG_DIR, exist_ok=True)
 
-_config_cache = {}
-_config_lock = threading.Lock()
+SQLITE_PATH = os.path.join(CONFIG_DIR, "configs.sqlite3")
 
 def get_config_path(guild_id):
     return os.path.join(CONFIG_DIR, f"{guild_id}.json")
 
-def load_config(guild_id):
-    with _config_lock:
-        if guild_id in _config_cache:
-            return _config_cache[guild_id].copy()
+
+class JsonBackend:
+    # One configs/<guild_id>.json per guild, replaced atomically on write
+    def read(self, guild_id):
         path = get_config_path(guild_id)
         if not os.path.exists(path):
-            _config_cache[guild_id] = {}
-            return {}
+            return None
         with open(path, 'r') as f:
-            data = json.load(f)
-            _config_cache[guild_id] = data
-            return data.copy()
+            return json.load(f)
+
+    def write_many(self, items):
+        for guild_id, data in items:
+            path = get_config_path(guild_id)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, path)
+
+    def close(self):
+        pass
+
+
+class SqliteBackend:
+    # Every guild in one WAL-mode database; a flush batch is one transaction
+    def __init__(self, path=SQLITE_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS guild_config ("
+            " guild_id INTEGER PRIMARY KEY,"
+            " data TEXT NOT NULL)"
+        )
+        self._db.commit()
+        self.migrate_json()
+
+    def migrate_json(self):
+        # Import per-guild JSON files that aren't in the database yet; the
+        # files are left in place so switching back to the JSON backend works
+        rows = []
+        for path in glob.glob(os.path.join(CONFIG_DIR, "*.json")):
+            name = os.path.basename(path)[:-5]
+            if not name.isdigit():
+                continue
+            try:
+                with open(path, 'r') as f:
+                    rows.append((int(name), json.dumps(json.load(f))))
+            except (OSError, ValueError) as e:
+                logging.error(f"[ERROR] skipping unreadable config {path}: {e}")
+        if not rows:
+            return
+        with self._lock, self._db:
+            cur = self._db.executemany(
+                "INSERT OR IGNORE INTO guild_config (guild_id, data) VALUES (?, ?)", rows
+            )
+        if cur.rowcount:
+            logging.info(f"📦 Migrated {cur.rowcount} guild config(s) from JSON to SQLite")
+
+    def read(self, guild_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM guild_config WHERE guild_id = ?", (int(guild_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def write_many(self, items):
+        rows = [(int(guild_id), json.dumps(data)) for guild_id, data in items]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO guild_config (guild_id, data) VALUES (?, ?)"
+                " ON CONFLICT(guild_id) DO UPDATE SET data = excluded.data",
+                rows,
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ConfigStore:
+    # In-memory configs with dirty tracking; a daemon thread writes dirty
+    # guilds in batches so callers on the event loop never touch the disk
+    # for a save.
+    def __init__(self, backend, flush_delay=CONFIG_FLUSH_DELAY):
+        self.backend = backend
+        self.flush_delay = flush_delay
+        self._cache = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name="config-flusher", daemon=True)
+        self._flusher.start()
+
+    def load(self, guild_id):
+        with self._lock:
+            if guild_id in self._cache:
+                return copy.deepcopy(self._cache[guild_id])
+        data = self.backend.read(guild_id) or {}
+        with self._lock:
+            # A save may have landed while we were reading
+            data = self._cache.setdefault(guild_id, data)
+            return copy.deepcopy(data)
+
+    def save(self, guild_id, data, guild_name=None):
+        data = copy.deepcopy(data)
+        with self._lock:
+            current = self._cache.get(guild_id)
+            if current is None:
+                current = self.backend.read(guild_id)
+            # Only add metadata if it's the first time saving
+            if not current and "__meta__" not in data:
+                data["__meta__"] = {
+                    "guild_name": guild_name or "Unknown",
+                    "created_at": datetime.datetime.utcnow().isoformat() + "Z"
+                }
+            self._cache[guild_id] = data
+            self._dirty.add(guild_id)
+            self._wakeup.notify()
+
+    def flush(self):
+        # Cached entries are never mutated in place, so a batch is a
+        # consistent snapshot even though the write happens unlocked
+        with self._write_lock:
+            with self._lock:
+                batch = [(guild_id, self._cache[guild_id]) for guild_id in self._dirty]
+                self._dirty.clear()
+            if not batch:
+                return
+            try:
+                self.backend.write_many(batch)
+            except Exception as e:
+                logging.error(f"[ERROR] config flush failed: {e}")
+                with self._lock:
+                    self._dirty.update(guild_id for guild_id, _ in batch)
+                raise
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+            # Let a burst of saves coalesce into one write
+            time.sleep(self.flush_delay)
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.flush_delay)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._flusher.join(timeout=5)
+        self.flush()
+        self.backend.close()
+
+
+def _make_backend():
+    if CONFIG_BACKEND == "sqlite":
+        return SqliteBackend()
+    return JsonBackend()
+
+
+_store = ConfigStore(_make_backend())
+
+
+def load_config(guild_id):
+    return _store.load(guild_id)
 
 def save_config(guild_id, data, guild_name=None):
-    path = get_config_path(guild_id)
-    with _config_lock:
-        # Only add metadata if it's the first time saving
-        if not os.path.exists(path):
-            data["__meta__"] = {
-                "guild_name": guild_name or "Unknown",
-                "created_at": datetime.datetime.utcnow().isoformat() + "Z"
-            }
-        _config_cache[guild_id] = data.copy()
-        # Atomic write
-        tmp_path = path + ".tmp"
-        with open(tmp_path, 'w') as f:
-            json.dump(data, f, indent=4)
-        os.replace(tmp_path, path)
+    _store.save(guild_id, data, guild_name=guild_name)
+
+def flush_configs():
+    _store.flush()
+
+atexit.register(_store.close)
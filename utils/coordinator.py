@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from settings import WORKER_ID, COORDINATOR_ADDRESS, COORDINATOR_AUTHKEY, COORDINATOR_LEASE_SECONDS
+
+
+class LeaseTable:
+    # Lives in the launcher process. Each service id is leased to one worker
+    # at a time; the holder renews by claiming again, and publishes what it
+    # polled so workers that share the server can read it.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases = {}
+        self._snapshots = {}
+
+    def claim_many(self, sids, worker_id, ttl):
+        now = time.monotonic()
+        owned = []
+        with self._lock:
+            # Leases nobody renewed, e.g. for servers no guild tracks any more
+            for sid in [sid for sid, (_, expires) in self._leases.items() if expires <= now]:
+                self._drop(sid)
+            for sid in sids:
+                owner, expires = self._leases.get(sid, (None, 0.0))
+                if owner is None or owner == worker_id or expires <= now:
+                    self._leases[sid] = (worker_id, now + ttl)
+                    owned.append(sid)
+        return owned
+
+    def release_worker(self, worker_id):
+        with self._lock:
+            for sid in [sid for sid, (owner, _) in self._leases.items() if owner == worker_id]:
+                self._drop(sid)
+
+    def release_many(self, sids, worker_id):
+        # Servers the worker stopped tracking; another worker may claim them
+        with self._lock:
+            for sid in sids:
+                if self._leases.get(sid, (None, 0.0))[0] == worker_id:
+                    self._drop(sid)
+
+    def _drop(self, sid):
+        # Snapshots go with their lease; callers hold the lock
+        self._leases.pop(sid, None)
+        self._snapshots.pop(sid, None)
+
+    def publish_many(self, snapshots):
+        with self._lock:
+            self._snapshots.update(snapshots)
+
+    def snapshots(self, sids):
+        with self._lock:
+            return {sid: self._snapshots[sid] for sid in sids if sid in self._snapshots}
+
+
+class CoordinatorServer(BaseManager):
+    pass
+
+
+class CoordinatorClient(BaseManager):
+    pass
+
+
+CoordinatorClient.register("leases")
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+class LocalCoordinator:
+    # Single process: every server is ours
+    async def partition(self, sids):
+        return list(sids), []
+
+    def publish(self, sid, snapshot):
+        pass
+
+    async def release(self, sids):
+        pass
+
+    async def flush(self):
+        pass
+
+    async def snapshots(self, sids):
+        return {}
+
+
+class SharedCoordinator:
+    # Client side of the launcher's LeaseTable. Proxy calls block on a socket,
+    # so they all run in a worker thread.
+    def __init__(self, address, authkey, worker_id, lease_seconds=COORDINATOR_LEASE_SECONDS):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._table = None
+        self._outbox = {}
+
+    def _connect(self):
+        if self._table is None:
+            manager = CoordinatorClient(address=self.address, authkey=self.authkey)
+            manager.connect()
+            self._table = manager.leases()
+        return self._table
+
+    def _claim(self, sids):
+        return self._connect().claim_many(sids, self.worker_id, self.lease_seconds)
+
+    async def partition(self, sids):
+        sids = list(sids)
+        try:
+            owned = set(await asyncio.to_thread(self._claim, sids))
+        except Exception as e:
+            # Better to double-poll than to stop polling
+            logging.warning(f"[WARN] coordinator unreachable, polling locally: {e}")
+            self._table = None
+            return sids, []
+        return [sid for sid in sids if sid in owned], [sid for sid in sids if sid not in owned]
+
+    def publish(self, sid, snapshot):
+        self._outbox[sid] = snapshot
+
+    async def release(self, sids):
+        sids = list(sids)
+        for sid in sids:
+            self._outbox.pop(sid, None)
+        try:
+            await asyncio.to_thread(lambda: self._connect().release_many(sids, self.worker_id))
+        except Exception as e:
+            # The lease simply runs out instead
+            logging.warning(f"[WARN] could not release leases on coordinator: {e}")
+            self._table = None
+
+    async def flush(self):
+        if not self._outbox:
+            return
+        outbox, self._outbox = self._outbox, {}
+        try:
+            await asyncio.to_thread(lambda: self._connect().publish_many(outbox))
+        except Exception as e:
+            logging.warning(f"[WARN] could not publish snapshots to coordinator: {e}")
+            self._table = None
+
+    async def snapshots(self, sids):
+        try:
+            return await asyncio.to_thread(lambda: self._connect().snapshots(list(sids)))
+        except Exception as e:
+            logging.warning(f"[WARN] could not read snapshots from coordinator: {e}")
+            self._table = None
+            return {}
+
+
+def serve(address, authkey):
+    # Run the lease table inside the launcher on a background thread
+    table = LeaseTable()
+    CoordinatorServer.register("leases", callable=lambda: table)
+    manager = CoordinatorServer(address=parse_address(address), authkey=authkey)
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, name="coordinator", daemon=True).start()
+    return table
+
+
+_coordinator = None
+
+
+def get_coordinator():
+    global _coordinator
+    if _coordinator is None:
+        if COORDINATOR_ADDRESS:
+            _coordinator = SharedCoordinator(COORDINATOR_ADDRESS, COORDINATOR_AUTHKEY, WORKER_ID)
+        else:
+            _coordinator = LocalCoordinator()
+    return _coordinator
@@ -0,0 +1,230 @@
+import asyncio
+import bisect
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+from settings import METRICS_HOST, METRICS_PORT, WORKER_ID
+
+# Upper bounds in seconds, shared by every histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_RE = re.compile(r"/\d+")
+
+
+def endpoint_label(path):
+    # /services/123/gameservers -> /services/{id}/gameservers
+    return _ID_RE.sub("/{id}", path.split("?", 1)[0])
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.help = {}
+
+    def _key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name, fn, **labels):
+        # fn is called at scrape time; re-registering replaces the old callback
+        self.gauges[self._key(name, labels)] = fn
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def render(self):
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_label_text(labels)} {value}")
+        for (name, labels), fn in sorted(self.gauges.items(), key=lambda item: item[0]):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            header(name, "gauge")
+            lines.append(f"{name}{_label_text(labels)} {value}")
+        for (name, labels), h in sorted(self.histograms.items(), key=lambda item: item[0]):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),))} {h.count}")
+            lines.append(f"{name}_sum{_label_text(labels)} {h.sum}")
+            lines.append(f"{name}_count{_label_text(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REGISTRY.describe("ark_phase_seconds", "Time spent in each status pipeline phase")
+REGISTRY.describe("ark_requests_total", "Outbound requests by target, endpoint and result")
+REGISTRY.describe("ark_event_loop_lag_seconds", "How late the event loop ran a timer scheduled to fire on time")
+
+
+@contextmanager
+def timer(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe("ark_phase_seconds", time.perf_counter() - start, phase=phase)
+
+
+def count_request(target, endpoint, result):
+    REGISTRY.inc("ark_requests_total", target=target, endpoint=endpoint, result=str(result))
+
+
+class LoopLagMonitor:
+    # Sleeps for a fixed interval and records how late each wake-up is
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.last = 0.0
+        self.worst = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.last = lag
+            self.worst = max(self.worst, lag)
+            REGISTRY.observe("ark_event_loop_lag_seconds", lag)
+            if lag > 1.0:
+                logging.warning(f"[WARN] event loop stalled for {lag:.2f}s")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+            REGISTRY.gauge("ark_event_loop_lag_last_seconds", lambda: self.last)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+lag_monitor = LoopLagMonitor()
+_runner = None
+
+
+async def _metrics_handler(request):
+    return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8",
+                        headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    global _runner
+    lag_monitor.start()
+    if not port or _runner is not None:
+        return
+    # Sharded workers each get their own port
+    port += WORKER_ID
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, host, port).start()
+    logging.info(f"📈 Metrics on http://{host}:{port}/metrics")
+
+
+async def stop_metrics_server():
+    global _runner
+    lag_monitor.stop()
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+
+
+def summary():
+    # Short plain-text digest for the !perf command
+    lines = ["Phase                 count    p50     p95     max"]
+    for (name, labels), h in sorted(REGISTRY.histograms.items(), key=lambda item: item[0]):
+        if name != "ark_phase_seconds":
+            continue
+        phase = dict(labels).get("phase", "?")
+        lines.append(
+            f"{phase:<20} {h.count:>6} {h.quantile(0.5) * 1000:>6.0f}ms "
+            f"{h.quantile(0.95) * 1000:>5.0f}ms {h.max * 1000:>6.0f}ms"
+        )
+    totals = {}
+    for (name, labels), value in REGISTRY.counters.items():
+        if name != "ark_requests_total":
+            continue
+        labels = dict(labels)
+        key = f"{labels['target']} {labels['endpoint']}"
+        ok, failed = totals.get(key, (0, 0))
+        if labels["result"] in ("ok", "200", "304", "skipped"):
+            ok += value
+        else:
+            failed += value
+        totals[key] = (ok, failed)
+    if totals:
+        lines.append("")
+        lines.append("Requests                              ok   failed")
+        for key, (ok, failed) in sorted(totals.items()):
+            lines.append(f"{key:<34} {ok:>6} {failed:>7}")
+    lines.append("")
+    lines.append(f"Event loop lag: last {lag_monitor.last * 1000:.1f}ms, worst {lag_monitor.worst * 1000:.1f}ms")
+    return "\n".join(lines)
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+
+import aiohttp
+
+from utils.metrics import count_request, endpoint_label
+from utils.rate_limit import TokenRateLimiter
+
+from settings import NITRADO_API_BASE, NITRADO_TIMEOUT, NITRADO_RATE_PER_SECOND, NITRADO_MAX_RETRIES
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# Bodies kept for conditional GETs, keyed by (token, path)
+VALIDATOR_CACHE_SIZE = 4096
+
+
+class NitradoError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(f"Nitrado API returned {status}{': ' + message if message else ''}")
+        self.status = status
+
+
+def _retry_after(resp):
+    value = resp.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class NitradoClient:
+    def __init__(self, base_url=NITRADO_API_BASE, timeout=NITRADO_TIMEOUT,
+                 rate=NITRADO_RATE_PER_SECOND, max_retries=NITRADO_MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, 5))
+        self.rate = rate
+        self.max_retries = max_retries
+        self._session = None
+        self._limiters = {}
+        self._validators = OrderedDict()
+        self.not_modified = 0
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=32,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"Accept": "application/json"},
+            )
+        return self._session
+
+    def _limiter(self, token):
+        limiter = self._limiters.get(token)
+        if limiter is None:
+            limiter = self._limiters[token] = TokenRateLimiter(self.rate)
+        return limiter
+
+    def _backoff(self, attempt):
+        # Full jitter keeps retries from many guilds from landing together
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    def _conditional_headers(self, key):
+        cached = self._validators.get(key)
+        if cached is None:
+            return {}
+        self._validators.move_to_end(key)
+        etag, last_modified, _ = cached
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _remember(self, key, resp, data):
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            self._validators.pop(key, None)
+            return
+        self._validators[key] = (etag, last_modified, data)
+        self._validators.move_to_end(key)
+        while len(self._validators) > VALIDATOR_CACHE_SIZE:
+            self._validators.popitem(last=False)
+
+    async def request(self, method, path, token, **kwargs):
+        session = self._get_session()
+        limiter = self._limiter(token)
+        # Plain GETs revalidate against the last body we saw instead of
+        # downloading it again, when Nitrado sent an ETag or Last-Modified
+        key = (token, path) if method == "GET" and "params" not in kwargs else None
+        headers = {
+            "Authorization": f"Bearer {token}",
+            **(self._conditional_headers(key) if key else {}),
+            **kwargs.pop("headers", {}),
+        }
+        url = f"{self.base_url}{path}"
+        endpoint = endpoint_label(path)
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            try:
+                async with session.request(method, url, headers=headers, **kwargs) as resp:
+                    count_request("nitrado", endpoint, resp.status)
+                    if resp.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = _retry_after(resp)
+                        if resp.status == 429:
+                            delay = delay if delay is not None else self._backoff(attempt)
+                            limiter.block_for(delay)
+                            logging.warning(f"[WARN] Nitrado rate limited on {path}, retrying in {delay:.1f}s")
+                        else:
+                            delay = delay if delay is not None else self._backoff(attempt)
+                            await asyncio.sleep(delay)
+                        continue
+                    if resp.status == 304 and key in self._validators:
+                        self.not_modified += 1
+                        return 200, self._validators[key][2]
+                    try:
+                        data = await resp.json(content_type=None)
+                    except ValueError:
+                        data = None
+                    if key and resp.status == 200:
+                        self._remember(key, resp, data)
+                    return resp.status, data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                count_request("nitrado", endpoint, type(e).__name__)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logging.warning(f"[WARN] Nitrado request {path} failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def get_json(self, path, token, **kwargs):
+        status, data = await self.request("GET", path, token, **kwargs)
+        if status != 200:
+            message = data.get("message", "") if isinstance(data, dict) else ""
+            raise NitradoError(status, message)
+        return data
+
+    async def ark_servers(self, token):
+        # [(service id, name)] for every ARK gameserver on the account;
+        # raises NitradoError if the token is rejected
+        data = await self.get_json("/services", token)
+        services = (data or {}).get("data", {}).get("services", [])
+        return [
+            (str(svc["id"]), svc.get("details", {}).get("name") or f"Server {svc['id']}")
+            for svc in services
+            if svc.get("type") == "gameserver"
+               and "ark" in svc.get("details", {}).get("game", "").lower()
+        ]
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = NitradoClient()
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
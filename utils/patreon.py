@@ -0,0 +1,232 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: writes are only serialised within this process
+    fcntl = None
+
+import aiohttp
+
+from settings import (
+    PATREON_CLIENT_ID, PATREON_CLIENT_SECRET, PATREON_REDIRECT_URI,
+    PATREON_CAMPAIGN_ID, PATREON_PREMIUM_CENTS, PATREON_RECHECK_HOURS,
+)
+
+AUTHORIZE_URL = "https://www.patreon.com/oauth2/authorize"
+TOKEN_URL = "https://www.patreon.com/api/oauth2/token"
+IDENTITY_URL = "https://www.patreon.com/api/oauth2/v2/identity"
+
+ENTITLEMENTS_PATH = os.path.join("data", "entitlements.json")
+# How long a /patreon link URL stays valid
+STATE_TTL = 900
+# Refresh access tokens this long before Patreon expires them
+REFRESH_MARGIN = 3 * 86400
+
+
+class PatreonError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(f"Patreon returned {status}{': ' + message if message else ''}")
+        self.status = status
+
+
+def _signature(payload):
+    return hmac.new(PATREON_CLIENT_SECRET.encode(), payload.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def sign_state(guild_id, user_id, now=None):
+    # The OAuth state names the guild being linked; signing it means the
+    # callback needs no server-side session and any worker can verify it
+    expires = int((now or time.time()) + STATE_TTL)
+    payload = f"{guild_id}.{user_id}.{expires}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def verify_state(state, now=None):
+    # Returns (guild_id, user_id), or None for a forged or expired state
+    try:
+        guild_id, user_id, expires, signature = state.split(".")
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return None
+    if not hmac.compare_digest(signature, _signature(f"{guild_id}.{user_id}.{expires}")):
+        return None
+    if expires < (now or time.time()):
+        return None
+    return int(guild_id), int(user_id)
+
+
+def authorize_url(state):
+    return AUTHORIZE_URL + "?" + urlencode({
+        "response_type": "code",
+        "client_id": PATREON_CLIENT_ID,
+        "redirect_uri": PATREON_REDIRECT_URI,
+        "scope": "identity identity.memberships",
+        "state": state,
+    })
+
+
+class PatreonClient:
+    def __init__(self, timeout=15):
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    async def _token(self, **form):
+        form.update(client_id=PATREON_CLIENT_ID, client_secret=PATREON_CLIENT_SECRET)
+        async with self._get_session().post(TOKEN_URL, data=form) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status != 200:
+                raise PatreonError(resp.status, (data or {}).get("error", ""))
+        return data
+
+    async def exchange_code(self, code):
+        return await self._token(code=code, grant_type="authorization_code", redirect_uri=PATREON_REDIRECT_URI)
+
+    async def refresh(self, refresh_token):
+        return await self._token(refresh_token=refresh_token, grant_type="refresh_token")
+
+    async def membership(self, access_token):
+        # (patreon user id, patron_status, entitled cents) for our campaign
+        params = {
+            "include": "memberships.campaign",
+            "fields[member]": "patron_status,currently_entitled_amount_cents",
+        }
+        headers = {"Authorization": f"Bearer {access_token}"}
+        async with self._get_session().get(IDENTITY_URL, params=params, headers=headers) as resp:
+            data = await resp.json(content_type=None)
+            if resp.status != 200:
+                raise PatreonError(resp.status)
+        status, cents = None, 0
+        for item in data.get("included", []):
+            if item.get("type") != "member":
+                continue
+            campaign = item.get("relationships", {}).get("campaign", {}).get("data") or {}
+            if campaign.get("id") != PATREON_CAMPAIGN_ID:
+                continue
+            attributes = item.get("attributes", {})
+            amount = attributes.get("currently_entitled_amount_cents") or 0
+            if amount >= cents:
+                status, cents = attributes.get("patron_status"), amount
+        return data.get("data", {}).get("id"), status, cents
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def token_fields(token):
+    return {
+        "access_token": token["access_token"],
+        "refresh_token": token.get("refresh_token"),
+        "expires_at": time.time() + float(token.get("expires_in", 0)),
+    }
+
+
+class EntitlementStore:
+    # Patreon link per guild, kept in memory so tier lookups never leave the
+    # process. Any worker may write the file (see update); the others pick
+    # up changes by mtime.
+    def __init__(self, path=ENTITLEMENTS_PATH):
+        self.path = path
+        self._records = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r") as f:
+                self._records = json.load(f)
+            self._mtime = mtime
+        except (OSError, ValueError) as e:
+            logging.error(f"[ERROR] could not read Patreon entitlements: {e}")
+
+    def get(self, guild_id):
+        return self._records.get(str(guild_id))
+
+    def is_premium(self, guild_id):
+        record = self._records.get(str(guild_id))
+        return (
+            record is not None
+            and record.get("patron_status") == "active_patron"
+            and record.get("cents", 0) >= PATREON_PREMIUM_CENTS
+        )
+
+    def premium_guilds(self, guild_ids):
+        return {guild_id for guild_id in guild_ids if self.is_premium(guild_id)}
+
+    def items(self):
+        return list(self._records.items())
+
+    def due(self, record, now=None):
+        # Needs a token refresh or a fresh look at the membership
+        now = now or time.time()
+        return (
+            record.get("expires_at", 0) - now < REFRESH_MARGIN
+            or now - record.get("checked_at", 0) > PATREON_RECHECK_HOURS * 3600
+        )
+
+    def update(self, change):
+        # Blocking; run it in a thread. Re-reads the file under an exclusive
+        # lock, applies change(records) and writes it back, so workers
+        # writing at the same time never drop each other's edits.
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.path, "r") as f:
+                    records = json.load(f)
+            except FileNotFoundError:
+                records = {}
+            result = change(records)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(records, f, indent=4)
+            os.replace(tmp, self.path)
+            self._records = records
+            self._mtime = os.stat(self.path).st_mtime
+        return result
+
+    def put(self, guild_id, record):
+        self.update(lambda records: records.__setitem__(str(guild_id), record))
+
+    def remove(self, guild_id):
+        return self.update(lambda records: records.pop(str(guild_id), None) is not None)
+
+    def merge(self, changed):
+        # Refreshed records; guilds unlinked in the meantime stay unlinked
+        def change(records):
+            for guild_id, record in changed.items():
+                if guild_id in records:
+                    records[guild_id] = record
+        self.update(change)
+
+
+_store = None
+
+
+def get_entitlements():
+    global _store
+    if _store is None:
+        _store = EntitlementStore()
+    return _store
@@ -0,0 +1,57 @@
+import sys
+
+# Rosters are capped so a misbehaving server can't grow memory without bound.
+# A2S reports at most 255 players and ARK names are short.
+MAX_NAMES = 255
+MAX_NAME_LENGTH = 32
+
+
+def roster_names(names):
+    # Normalise a raw name list into what the tracker stores: trimmed,
+    # truncated, interned (the same names repeat across polls) and
+    # without the blank names ARK reports for players still connecting
+    cleaned = []
+    for name in names:
+        name = (name or "").strip()[:MAX_NAME_LENGTH]
+        if name:
+            cleaned.append(sys.intern(name))
+            if len(cleaned) >= MAX_NAMES:
+                break
+    return frozenset(cleaned)
+
+
+class PlayerTracker:
+    # Last known roster per service id, and the joins/leaves between polls.
+    # The first roster seen for a server is only a baseline, so a restart of
+    # the bot doesn't announce everybody as having just joined.
+    def __init__(self):
+        self._rosters = {}
+
+    def __len__(self):
+        return len(self._rosters)
+
+    def update(self, sid, names):
+        # Returns (joined, left) as sorted lists, or None when nothing changed
+        sid = str(sid)
+        roster = names if isinstance(names, frozenset) else roster_names(names)
+        previous = self._rosters.get(sid)
+        if previous == roster:
+            return None
+        self._rosters[sid] = roster
+        if previous is None:
+            return None
+        return sorted(roster - previous), sorted(previous - roster)
+
+    def retain(self, sids):
+        # Drop rosters for servers nobody logs players for any more
+        for sid in [sid for sid in self._rosters if sid not in sids]:
+            del self._rosters[sid]
+
+
+def online_players(payload):
+    # Nitrado's players endpoint lists everyone the server has seen, with an
+    # "online" flag; only those currently online count
+    data = (payload or {}).get("data") or {}
+    if isinstance(data, dict):
+        data = data.get("players") or data.get("data") or []
+    return [p for p in data if isinstance(p, dict) and p.get("online", True)]
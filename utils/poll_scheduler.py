@@ -0,0 +1,219 @@
+import heapq
+import itertools
+import logging
+import time
+
+from settings import (
+    STATUS_POLL_TRANSITIONAL_SECONDS, STATUS_POLL_CHANGED_SECONDS,
+    STATUS_POLL_STABLE_MAX_SECONDS, STATUS_POLL_SUSPENDED_SECONDS,
+    STATUS_GLOBAL_POLLS_PER_MINUTE, STATUS_GUILD_POLLS_PER_TICK, STATUS_PREMIUM_INTERVAL_FACTOR,
+    WARM_START_SPREAD_SECONDS,
+)
+
+TRANSITIONAL = {"restarting", "updating", "starting", "stopping", "installing", "backup_restore", "backup_creation"}
+ONLINE = {"started", "online"}
+SUSPENDED = {"suspended", "stopped", "gs_installation"}
+
+# Budget-deferred servers are retried this many seconds later
+DEFER_SECONDS = 5.0
+
+
+class _ServerState:
+    __slots__ = ("sid", "status", "stable_polls", "next_due", "guilds", "version")
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.status = None
+        self.stable_polls = 0
+        self.next_due = 0.0
+        self.guilds = set()
+        self.version = 0
+
+
+class PollScheduler:
+    # Priority queue of service ids ordered by next poll time. Each poll's
+    # observed status sets the next one: transitional servers are polled
+    # quickly, servers that just changed soon after, stable ones back off
+    # towards the stable cap and suspended ones are left alone for longest.
+    def __init__(self,
+                 transitional=STATUS_POLL_TRANSITIONAL_SECONDS,
+                 changed=STATUS_POLL_CHANGED_SECONDS,
+                 stable_max=STATUS_POLL_STABLE_MAX_SECONDS,
+                 suspended=STATUS_POLL_SUSPENDED_SECONDS,
+                 global_per_minute=STATUS_GLOBAL_POLLS_PER_MINUTE,
+                 guild_per_tick=STATUS_GUILD_POLLS_PER_TICK,
+                 premium_factor=STATUS_PREMIUM_INTERVAL_FACTOR,
+                 warm_spread=WARM_START_SPREAD_SECONDS):
+        self.transitional = transitional
+        self.changed = changed
+        self.stable_max = stable_max
+        self.suspended = suspended
+        self.global_per_minute = global_per_minute
+        self.guild_per_tick = guild_per_tick
+        self.premium_factor = premium_factor
+        self.warm_spread = warm_spread
+        # Guilds whose servers are polled premium_factor times as often
+        self.premium_guilds = set()
+        self._servers = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._inflight = set()
+        self._budget = float(global_per_minute)
+        self._budget_updated = time.monotonic()
+        self.deferred = 0
+
+    def __len__(self):
+        return len(self._servers)
+
+    def _push(self, state, due):
+        state.next_due = due
+        state.version += 1
+        heapq.heappush(self._heap, (due, next(self._seq), state.version, state.sid))
+
+    def sync(self, guild_servers, seeds=None):
+        # guild_servers: {guild_id: [sid, ...]} for every guild with polling enabled.
+        # Returns the service ids no longer tracked.
+        # seeds: {sid: (status, stable_polls, seconds until due)} restored at
+        # startup, so each server keeps the schedule it had before. Overdue
+        # servers, and ones with no seed at all, are spread over a warm-up
+        # window (no seeds first, then oldest first) instead of all coming
+        # due on the first tick.
+        wanted = {}
+        for guild_id, sids in guild_servers.items():
+            for sid in sids:
+                wanted.setdefault(str(sid), set()).add(guild_id)
+        now = time.monotonic()
+        overdue = []
+        for sid, guilds in wanted.items():
+            state = self._servers.get(sid)
+            if state is not None:
+                state.guilds = guilds
+                continue
+            state = self._servers[sid] = _ServerState(sid)
+            state.guilds = guilds
+            if not seeds:
+                self._push(state, now)
+                continue
+            seed = seeds.get(sid)
+            if seed is None:
+                overdue.append((float("-inf"), state))
+                continue
+            state.status, state.stable_polls, due_in = seed
+            if due_in > 0:
+                self._push(state, now + due_in)
+            else:
+                overdue.append((due_in, state))
+        if overdue:
+            # Wide enough that the global budget never has to defer them
+            window = max(self.warm_spread, len(overdue) * 60.0 / self.global_per_minute)
+            overdue.sort(key=lambda item: item[0])
+            for i, (_, state) in enumerate(overdue):
+                self._push(state, now + window * i / len(overdue))
+        dropped = [sid for sid in self._servers if sid not in wanted]
+        for sid in dropped:
+            del self._servers[sid]
+            self._inflight.discard(sid)
+        return dropped
+
+    def export(self):
+        # {sid: (status, stable_polls, wall-clock due time)}, for the warm start file
+        now = time.monotonic()
+        wall = time.time()
+        return {
+            sid: (state.status, state.stable_polls, wall + state.next_due - now)
+            for sid, state in self._servers.items()
+        }
+
+    def guilds_for(self, sid):
+        state = self._servers.get(str(sid))
+        return state.guilds if state else set()
+
+    def _refill(self, now):
+        rate = self.global_per_minute / 60.0
+        self._budget = min(self.global_per_minute, self._budget + (now - self._budget_updated) * rate)
+        self._budget_updated = now
+
+    def pop_due(self):
+        # Due service ids this tick, within the global and per-guild budgets
+        now = time.monotonic()
+        self._refill(now)
+        due = []
+        deferred = []
+        per_guild = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, _, version, sid = heapq.heappop(self._heap)
+            state = self._servers.get(sid)
+            if state is None or state.version != version or sid in self._inflight:
+                continue
+            owner = min(state.guilds) if state.guilds else None
+            if self._budget < 1 or per_guild.get(owner, 0) >= self.guild_per_tick:
+                deferred.append(state)
+                continue
+            self._budget -= 1
+            per_guild[owner] = per_guild.get(owner, 0) + 1
+            self._inflight.add(sid)
+            due.append(sid)
+        for state in deferred:
+            self._push(state, now + DEFER_SECONDS)
+        if deferred:
+            self.deferred += len(deferred)
+            logging.debug(f"[DEBUG] poll budget deferred {len(deferred)} server(s)")
+        return due
+
+    def interval_for(self, state, changed):
+        interval = self._base_interval(state, changed)
+        if state.guilds & self.premium_guilds:
+            interval *= self.premium_factor
+        return interval
+
+    def expected_interval(self, sid):
+        # How long the server may go between polls as things stand
+        state = self._servers.get(str(sid))
+        return self.stable_max if state is None else self.interval_for(state, False)
+
+    def _base_interval(self, state, changed):
+        status = state.status or "unknown"
+        if status in TRANSITIONAL:
+            return self.transitional
+        if changed:
+            return self.changed
+        if status in SUSPENDED:
+            return self.suspended
+        if status in ONLINE:
+            # Double the interval for every unchanged poll, up to the cap
+            return min(self.stable_max, self.changed * 2 ** state.stable_polls)
+        # Unknown or failing: check back at the stable cap rather than hammering it
+        return self.stable_max
+
+    def observe(self, sid, status):
+        # Only polls handed out by pop_due count; cache hits are ignored
+        sid = str(sid)
+        if sid not in self._inflight:
+            return False
+        self._inflight.discard(sid)
+        state = self._servers.get(sid)
+        if state is None:
+            return False
+        changed = state.status is not None and state.status != status
+        state.status = status
+        state.stable_polls = 0 if changed else state.stable_polls + 1
+        self._push(state, time.monotonic() + self.interval_for(state, changed))
+        return True
+
+    def release(self, sid):
+        # A due poll that never produced an observation; retry after a short delay
+        sid = str(sid)
+        if sid in self._inflight:
+            self._inflight.discard(sid)
+            state = self._servers.get(sid)
+            if state is not None:
+                self._push(state, time.monotonic() + DEFER_SECONDS)
+
+    def postpone(self, sid, seconds):
+        # Push a server's next poll out to at least `seconds` from now
+        state = self._servers.get(str(sid))
+        if state is None or state.sid in self._inflight:
+            return
+        due = time.monotonic() + seconds
+        if due > state.next_due:
+            self._push(state, due)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+
+# Guild starts are spread over this fraction of the interval, leaving the
+# rest as headroom for the slowest guilds to finish inside the budget.
+SPREAD_FRACTION = 0.5
+
+
+class CycleReport:
+    def __init__(self, total, budget):
+        self.total = total
+        self.budget = budget
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.elapsed = 0.0
+
+    @property
+    def over_budget(self):
+        return bool(self.budget) and self.elapsed > self.budget
+
+
+class GuildScheduler:
+    # report_every: seconds between INFO summaries of the cycles run since the
+    # last one. Single cycles are only logged at DEBUG, or WARN when over budget.
+    def __init__(self, concurrency, interval, timeout=None, report_every=None):
+        self.concurrency = max(1, concurrency)
+        self.interval = interval
+        self.timeout = timeout
+        self.report_every = report_every
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.last_report = None
+        self._window = []
+        self._window_start = time.monotonic()
+
+    async def run_cycle(self, guilds, worker):
+        guilds = list(guilds)
+        report = CycleReport(len(guilds), self.interval)
+        start = time.monotonic()
+
+        step = (self.interval * SPREAD_FRACTION) / len(guilds) if guilds else 0
+
+        async def run_one(index, guild):
+            # Stagger start times so a big fleet doesn't hit the APIs in one burst
+            await asyncio.sleep(index * step)
+            async with self._semaphore:
+                try:
+                    await asyncio.wait_for(worker(guild), self.timeout)
+                    report.completed += 1
+                except asyncio.TimeoutError:
+                    report.timed_out += 1
+                    logging.warning(f"[WARN] status update for guild {guild.id} timed out after {self.timeout}s")
+                except Exception as e:
+                    report.failed += 1
+                    logging.error(f"[ERROR] status update for guild {guild.id} failed: {e}")
+
+        await asyncio.gather(*(run_one(i, g) for i, g in enumerate(guilds)))
+
+        report.elapsed = time.monotonic() - start
+        self.last_report = report
+        usage = (report.elapsed / self.interval * 100) if self.interval else 0
+        message = (
+            f"⏱️ Status cycle: {report.completed}/{report.total} guild(s) in "
+            f"{report.elapsed:.1f}s of {self.interval:.0f}s budget ({usage:.0f}%), "
+            f"{report.failed} failed, {report.timed_out} timed out"
+        )
+        if report.over_budget:
+            logging.warning(f"[WARN] {message}")
+        else:
+            logging.debug(message)
+        self._summarize(report)
+        return report
+
+    def _summarize(self, report):
+        if not self.report_every:
+            return
+        self._window.append(report)
+        now = time.monotonic()
+        if now - self._window_start < self.report_every:
+            return
+        window, self._window = self._window, []
+        elapsed = now - self._window_start
+        self._window_start = now
+        over = sum(1 for r in window if r.over_budget)
+        logging.info(
+            f"⏱️ Status cycles in the last {elapsed / 60:.0f} min: {len(window)} cycle(s), "
+            f"{sum(r.completed for r in window)}/{sum(r.total for r in window)} guild refresh(es), "
+            f"slowest {max(r.elapsed for r in window):.1f}s of {self.interval:.0f}s budget, "
+            f"{over} over budget, {sum(r.failed for r in window)} failed, "
+            f"{sum(r.timed_out for r in window)} timed out"
+        )
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+# Imported first by bot.py, so phase times are measured from here
+_started = time.perf_counter()
+
+COMMAND_FINGERPRINT_PATH = os.path.join("data", "command_tree.json")
+
+
+class StartupTimer:
+    # Logs how long each startup phase took, once per phase per process
+    def __init__(self, started=_started):
+        self.started = started
+        self.last = started
+        self.phases = {}
+
+    def mark(self, phase):
+        if phase in self.phases:
+            return
+        now = time.perf_counter()
+        self.phases[phase] = now - self.started
+        logging.info(f"⏱️ Startup: {phase} +{now - self.last:.2f}s ({now - self.started:.2f}s total)")
+        self.last = now
+        from utils.metrics import REGISTRY
+        REGISTRY.gauge("ark_startup_seconds", lambda value=self.phases[phase]: value, phase=phase)
+
+
+startup = StartupTimer()
+
+
+def tree_fingerprint(tree):
+    # Hash of the global command payloads exactly as they would be uploaded
+    payload = sorted((cmd.to_dict(tree) for cmd in tree.get_commands()),
+                     key=lambda cmd: (cmd.get("type", 1), cmd["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _load_fingerprint(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_fingerprint(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp, path)
+
+
+async def sync_tree_if_changed(bot, path=COMMAND_FINGERPRINT_PATH):
+    # Global sync is heavily rate limited and only needed when a command's
+    # signature changed, so compare against what was last uploaded
+    fingerprint = tree_fingerprint(bot.tree)
+    saved = _load_fingerprint(path)
+    if saved.get("fingerprint") == fingerprint and saved.get("application_id") == bot.application_id:
+        logging.info("🔧 Slash commands unchanged, skipping sync.")
+        return None
+    synced = await bot.tree.sync()
+    _save_fingerprint(path, {"fingerprint": fingerprint, "application_id": bot.application_id})
+    return synced
@@ -0,0 +1,209 @@
+import os
+import struct
+import threading
+import time
+
+from settings import (
+    TIMESERIES_RAW_RETENTION_DAYS, TIMESERIES_DAILY_RETENTION_DAYS,
+    STATUS_POLL_SUSPENDED_SECONDS, STATUS_POLL_STABLE_MAX_SECONDS, STATUS_TICK_SECONDS, STATUS_GUILD_TIMEOUT,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'timeseries')
+
+# Raw sample: unix time, players, max players, status code
+RAW = struct.Struct("<IHHB")
+# Daily rollup: day number, samples, player-seconds, covered seconds, peak, online seconds
+DAILY = struct.Struct("<IIIIHI")
+
+STATUS_UNKNOWN, STATUS_ONLINE, STATUS_TRANSITIONAL, STATUS_OFFLINE = range(4)
+
+# A gap longer than this between two samples is not credited to either: the
+# poll scheduler's longest interval, plus a tick of lateness and a refresh
+MAX_GAP = max(STATUS_POLL_SUSPENDED_SECONDS, STATUS_POLL_STABLE_MAX_SECONDS) + STATUS_TICK_SECONDS + STATUS_GUILD_TIMEOUT
+DAY = 86400
+
+
+def status_code(status):
+    if status in ("started", "online"):
+        return STATUS_ONLINE
+    if status in ("restarting", "updating"):
+        return STATUS_TRANSITIONAL
+    if status in ("unknown", None):
+        return STATUS_UNKNOWN
+    return STATUS_OFFLINE
+
+
+class DailyRollup:
+    __slots__ = ("day", "samples", "player_seconds", "seconds", "peak", "online_seconds")
+
+    def __init__(self, day, samples=0, player_seconds=0, seconds=0, peak=0, online_seconds=0):
+        self.day = day
+        self.samples = samples
+        self.player_seconds = player_seconds
+        self.seconds = seconds
+        self.peak = peak
+        self.online_seconds = online_seconds
+
+    @property
+    def average(self):
+        return self.player_seconds / self.seconds if self.seconds else 0.0
+
+    @property
+    def uptime(self):
+        return self.online_seconds / self.seconds if self.seconds else 0.0
+
+    def pack(self):
+        return DAILY.pack(self.day, self.samples, self.player_seconds, self.seconds,
+                          min(self.peak, 0xFFFF), self.online_seconds)
+
+
+class _Series:
+    def __init__(self, sid):
+        self.sid = sid
+        self.pending = []
+        self.today = None
+        self.today_offset = None
+        self.last = None  # (ts, players, status code) of the latest sample
+        self.compacted_day = None
+        self.loaded = False
+
+
+class TimeSeriesStore:
+    # Per-server append-only files under data/timeseries: <sid>.raw holds
+    # fixed-width samples for a short window, <sid>.day one rollup record per
+    # day. The current day's rollup is rewritten in place as samples arrive,
+    # so history queries never touch raw samples.
+    def __init__(self, data_dir=DATA_DIR,
+                 raw_retention_days=TIMESERIES_RAW_RETENTION_DAYS,
+                 daily_retention_days=TIMESERIES_DAILY_RETENTION_DAYS):
+        self.data_dir = data_dir
+        self.raw_retention_days = raw_retention_days
+        self.daily_retention_days = daily_retention_days
+        self._series = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    def _path(self, sid, ext):
+        return os.path.join(self.data_dir, f"{sid}.{ext}")
+
+    def record(self, sid, players, max_players, status, ts=None):
+        # Cheap and in-memory; flush() does the disk work
+        ts = int(ts if ts is not None else time.time())
+        players = players if isinstance(players, int) else 0
+        max_players = max_players if isinstance(max_players, int) else 0
+        with self._lock:
+            series = self._series.setdefault(str(sid), _Series(str(sid)))
+            series.pending.append((ts, players, max_players, status_code(status)))
+
+    def _load(self, series):
+        raw_path = self._path(series.sid, "raw")
+        if os.path.exists(raw_path):
+            size = os.path.getsize(raw_path)
+            size -= size % RAW.size
+            if size:
+                with open(raw_path, "rb") as f:
+                    f.seek(size - RAW.size)
+                    ts, players, _, code = RAW.unpack(f.read(RAW.size))
+                series.last = (ts, players, code)
+        day_path = self._path(series.sid, "day")
+        if os.path.exists(day_path):
+            size = os.path.getsize(day_path) - os.path.getsize(day_path) % DAILY.size
+            if size:
+                with open(day_path, "rb") as f:
+                    f.seek(size - DAILY.size)
+                    series.today = DailyRollup(*DAILY.unpack(f.read(DAILY.size)))
+                    series.today_offset = size - DAILY.size
+        series.loaded = True
+
+    def _apply(self, series, ts, players, code):
+        day = ts // DAY
+        if series.today is None or series.today.day != day:
+            series.today = DailyRollup(day)
+            series.today_offset = None
+        rollup = series.today
+        if series.last is not None:
+            last_ts, last_players, last_code = series.last
+            gap = ts - last_ts
+            if 0 < gap <= MAX_GAP:
+                # Step function: the previous reading holds until this one
+                rollup.player_seconds += last_players * gap
+                rollup.seconds += gap
+                if last_code == STATUS_ONLINE:
+                    rollup.online_seconds += gap
+        rollup.samples += 1
+        rollup.peak = max(rollup.peak, players)
+        series.last = (ts, players, code)
+
+    def _write_series(self, series, samples):
+        if not series.loaded:
+            self._load(series)
+        with open(self._path(series.sid, "raw"), "ab") as f:
+            f.write(b"".join(RAW.pack(*sample) for sample in samples))
+        day_path = self._path(series.sid, "day")
+        with open(day_path, "r+b" if os.path.exists(day_path) else "w+b") as f:
+            for ts, players, _, code in samples:
+                self._apply(series, ts, players, code)
+                if series.today_offset is None:
+                    # New day: append a fresh record after the last whole one
+                    end = f.seek(0, os.SEEK_END)
+                    series.today_offset = end - end % DAILY.size
+                f.seek(series.today_offset)
+                f.write(series.today.pack())
+        today = int(time.time()) // DAY
+        if series.compacted_day != today:
+            series.compacted_day = today
+            self._compact(series, today)
+
+    def _truncate(self, path, record, keep_from, key):
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        data = data[:len(data) - len(data) % record.size]
+        start = 0
+        while start < len(data) and key(record.unpack_from(data, start)) < keep_from:
+            start += record.size
+        if start:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data[start:])
+            os.replace(tmp_path, path)
+        return start
+
+    def _compact(self, series, today):
+        # Records are appended in time order, so retention only trims a prefix
+        self._truncate(self._path(series.sid, "raw"), RAW,
+                       (today - self.raw_retention_days) * DAY, lambda r: r[0])
+        trimmed = self._truncate(self._path(series.sid, "day"), DAILY,
+                                 today - self.daily_retention_days, lambda r: r[0])
+        if trimmed and series.today_offset is not None:
+            # The open record itself may have aged out; it gets re-appended
+            offset = series.today_offset - trimmed
+            series.today_offset = offset if offset >= 0 else None
+
+    def flush(self):
+        # Blocking; run it off the event loop
+        with self._lock:
+            batches = [(s, s.pending) for s in self._series.values() if s.pending]
+            for series, _ in batches:
+                series.pending = []
+        with self._io_lock:
+            for series, samples in batches:
+                self._write_series(series, samples)
+
+    def daily(self, sid, days):
+        # Blocking; the last `days` daily rollups for a server, oldest first
+        path = self._path(str(sid), "day")
+        if not os.path.exists(path):
+            return []
+        with self._io_lock:
+            size = os.path.getsize(path)
+            size -= size % DAILY.size
+            count = min(days, size // DAILY.size)
+            with open(path, "rb") as f:
+                f.seek(size - count * DAILY.size)
+                data = f.read(count * DAILY.size)
+        first_day = int(time.time()) // DAY - days + 1
+        rollups = [DailyRollup(*DAILY.unpack_from(data, i)) for i in range(0, len(data), DAILY.size)]
+        return [r for r in rollups if r.day >= first_day]
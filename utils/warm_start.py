@@ -0,0 +1,56 @@
+import gzip
+import json
+import logging
+import os
+import time
+
+from settings import WARM_START_PATH, WARM_START_MAX_AGE_HOURS, WORKER_ID
+
+VERSION = 2
+
+
+def default_path():
+    # Sharded workers each keep their own file
+    if not WORKER_ID:
+        return WARM_START_PATH
+    directory, name = os.path.split(WARM_START_PATH)
+    stem, dot, ext = name.partition(".")
+    return os.path.join(directory, f"{stem}-{WORKER_ID}{dot}{ext}")
+
+
+def save(path, servers, guilds, schedule):
+    # servers: {sid: snapshot}; guilds: {guild_id: posted embed fingerprint};
+    # schedule: {sid: (status, stable_polls, due_at)}. Blocking.
+    data = {
+        "version": VERSION, "saved_at": time.time(),
+        "servers": servers, "guilds": guilds, "schedule": schedule,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load(path, max_age=WARM_START_MAX_AGE_HOURS * 3600):
+    # Returns (servers, guilds, schedule); all empty if there is nothing usable
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}, {}, {}
+    except (OSError, ValueError, EOFError) as e:
+        logging.warning(f"[WARN] ignoring unreadable warm start file {path}: {e}")
+        return {}, {}, {}
+    if data.get("version") != VERSION:
+        return {}, {}, {}
+    cutoff = time.time() - max_age
+    servers = {
+        sid: snapshot for sid, snapshot in data.get("servers", {}).items()
+        if snapshot.get("polled_at", 0) >= cutoff
+    }
+    guilds = {int(guild_id): fingerprint for guild_id, fingerprint in data.get("guilds", {}).items()}
+    if data.get("saved_at", 0) < cutoff:
+        guilds = {}
+    schedule = {sid: tuple(entry) for sid, entry in data.get("schedule", {}).items() if sid in servers}
+    return servers, guilds, schedule
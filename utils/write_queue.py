@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from utils.rate_limit import TokenRateLimiter
+from settings import DISCORD_WRITES_PER_SECOND, DISCORD_WRITE_CONCURRENCY, DISCORD_CHANNEL_WRITE_INTERVAL
+
+
+class _Write:
+    __slots__ = ("channel_id", "key", "fn")
+
+    def __init__(self, channel_id, key, fn):
+        self.channel_id = channel_id
+        self.key = key
+        self.fn = fn
+
+
+class WriteQueue:
+    # Outbound Discord writes, decoupled from polling. Writes with the same
+    # key coalesce: only the latest pending one is kept (the rest count as
+    # dropped). Each channel gets one write at a time, spaced by
+    # channel_interval and pushed back by any 429, and all channels share a
+    # global rate and concurrency limit.
+    def __init__(self, rate=DISCORD_WRITES_PER_SECOND, concurrency=DISCORD_WRITE_CONCURRENCY,
+                 channel_interval=DISCORD_CHANNEL_WRITE_INTERVAL):
+        self.channel_interval = channel_interval
+        self._limiter = TokenRateLimiter(rate)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._pending = {}
+        self._channels = {}
+        self._next_at = {}
+        self._busy = set()
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = None
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        # 429s, retried rather than failed
+        self.rate_limited = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, channel_id, fn, key=None):
+        # fn is a zero-argument coroutine function; key=None never coalesces
+        if key is None:
+            key = object()
+        if self.cancel(key):
+            self.dropped += 1
+        self._pending[key] = _Write(channel_id, key, fn)
+        self._channels.setdefault(channel_id, deque()).append(key)
+        self._idle.clear()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def cancel(self, key):
+        write = self._pending.pop(key, None)
+        if write is None:
+            return False
+        queue = self._channels.get(write.channel_id)
+        if queue is not None:
+            queue.remove(key)
+            if not queue:
+                del self._channels[write.channel_id]
+        self._check_idle()
+        return True
+
+    def _check_idle(self):
+        if not self._pending and not self._busy:
+            self._idle.set()
+
+    async def drain(self):
+        await self._idle.wait()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            wait = None
+            for channel_id in [c for c, t in self._next_at.items() if t <= now and c not in self._channels]:
+                del self._next_at[channel_id]
+            for channel_id in list(self._channels):
+                if channel_id in self._busy:
+                    continue
+                ready_at = self._next_at.get(channel_id, 0.0)
+                if ready_at > now:
+                    wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                    continue
+                queue = self._channels[channel_id]
+                write = self._pending.pop(queue.popleft())
+                if not queue:
+                    del self._channels[channel_id]
+                self._busy.add(channel_id)
+                task = asyncio.ensure_future(self._write(write))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _write(self, write):
+        retry_after = None
+        try:
+            async with self._slots:
+                await self._limiter.acquire()
+                await write.fn()
+            self.written += 1
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.rate_limited += 1
+                retry_after = getattr(e, "retry_after", None) or 5.0
+                logging.warning(f"[WARN] Discord write to channel {write.channel_id} rate limited, retrying in {retry_after:.1f}s")
+            else:
+                self.failed += 1
+                logging.warning(f"[WARN] Discord write to channel {write.channel_id} failed: {e}")
+        except Exception as e:
+            self.failed += 1
+            logging.error(f"[ERROR] Discord write to channel {write.channel_id} failed: {e}")
+        finally:
+            self._busy.discard(write.channel_id)
+            self._next_at[write.channel_id] = time.monotonic() + (retry_after or self.channel_interval)
+            if retry_after and write.key not in self._pending:
+                # Rate limited and nothing newer queued: try this one again
+                self._pending[write.key] = write
+                self._channels.setdefault(write.channel_id, deque()).appendleft(write.key)
+            self._check_idle()
+            self._wakeup.set()
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None